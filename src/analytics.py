@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Analytics of ensembles of grown networks
+
+Loads each run once, as a pickled model or in the columnar run format of
+src.storage, into its (T, N) score matrix, which is lower triangular since
+nodes only ever join. The relative ranks of every node in every snapshot
+follow from a single stable argsort along the nodes, with ties broken by
+node ID as in plots_ranks.ipynb. From these come the rank trajectories
+of the nodes entering at given steps, the rank of each node on entry and
+the entry steps of the alters each node selects. The arrays of each run
+can be cached on disk, keyed by the hash of the content of the run.
+
+Example:
+    frames = ensemble(glob.glob("networks/i1o1_m3_a0.95_g*/run_*.pkl"), steps=[3, 10, 20], cache_dir="cache")
+    frames["entrants"].groupby("network")["rank"].mean()
+"""
+
+import os
+import re
+import pickle
+import hashlib
+import numpy as np
+
+from src.storage import arrays, load_run
+
+# Version of the cached arrays, to be raised when they change
+VERSION = 1
+
+def fingerprint(path):
+    """
+    Hash of the content of a run, a pickle file or a run directory.
+
+    Parameters
+    ----------
+    path (str): the run file or directory.
+
+    Returns
+    -------
+    key (str): the hexadecimal SHA-256 digest.
+
+    """
+    digest = hashlib.sha256()
+    files = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+    for file in files:
+        digest.update(os.path.basename(file).encode())
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def matrix(path):
+    """
+    The edges, snapshot sizes and score matrix of a run.
+
+    Parameters
+    ----------
+    path (str): the run, a pickle file or a run directory.
+
+    Returns
+    -------
+    edges (np.ndarray): (E, 2) source and target of each edge.
+    sizes (np.ndarray): (T,) number of nodes in each snapshot.
+    scores (np.ndarray): (T, N) score of each node in each snapshot, NaN
+                         before the node joins.
+
+    """
+    if os.path.isdir(path):
+        run = load_run(path, mmap=False)
+        return run.edges, run.sizes, run.scores
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+    return arrays(model)
+
+def ranks(scores):
+    """
+    Relative ranks of every node in every snapshot: the position of each
+    node among the nodes of the snapshot sorted by ascending score, ties
+    broken by node ID, over n - 1.
+
+    Parameters
+    ----------
+    scores (np.ndarray): (T, N) score matrix, NaN before each node joins.
+
+    Returns
+    -------
+    R (np.ndarray): (T, N) relative ranks, NaN before each node joins.
+
+    """
+    missing = np.isnan(scores)
+    # NaN sorts last, so the nodes of each snapshot take the first ranks
+    order = np.argsort(scores, axis=1, kind="stable")
+    R = np.empty(scores.shape)
+    np.put_along_axis(R, order, np.broadcast_to(np.arange(scores.shape[1], dtype=float), scores.shape), axis=1)
+    sizes = scores.shape[1] - missing.sum(axis=1)
+    R /= np.maximum(sizes - 1, 1)[:, None]
+    R[missing] = np.nan
+    return R
+
+def load(path, cache_dir=None):
+    """
+    Load a run into its arrays, from the cache if it has them.
+
+    Parameters
+    ----------
+    path (str): the run, a pickle file or a run directory.
+    cache_dir (str): the cache directory, or None not to cache.
+
+    Returns
+    -------
+    run (dict): the "edges", "sizes", "scores" and relative "ranks" of the run.
+
+    """
+    if cache_dir is not None:
+        file = os.path.join(cache_dir, "%s_v%d.npz" % (fingerprint(path), VERSION))
+        if os.path.exists(file):
+            with np.load(file) as data:
+                return {key: data[key] for key in data.files}
+    edges, sizes, scores = matrix(path)
+    run = {"edges":np.asarray(edges), "sizes":np.asarray(sizes), "scores":np.asarray(scores)}
+    run["ranks"] = ranks(run["scores"])
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so an interrupted save leaves no entry
+        with open(file + ".tmp", "wb") as f:
+            np.savez(f, **run)
+        os.replace(file + ".tmp", file)
+    return run
+
+def trajectories(run, steps):
+    """
+    Rank and score trajectories of the nodes entering at the given steps,
+    from the snapshot of step i onwards, as in plots_ranks.ipynb. The node
+    entering at step i is node i - 1.
+
+    Parameters
+    ----------
+    run (dict): the run, as given by load().
+    steps (list): the steps i.
+
+    Returns
+    -------
+    trajectories (dict): for each step, the (T - i + 1,) ranks and scores
+                         of its node.
+
+    """
+    return {i: (run["ranks"][i-1:, i-1], run["scores"][i-1:, i-1]) for i in steps}
+
+def entrants(run):
+    """
+    Relative rank of each node in the snapshot it joins.
+
+    Parameters
+    ----------
+    run (dict): the run, as given by load().
+
+    Returns
+    -------
+    nodes (np.ndarray): the nodes that joined after the initial network.
+    ranks (np.ndarray): the relative rank of each on entry.
+
+    """
+    rows = np.flatnonzero(np.diff(run["sizes"]) > 0) + 1
+    nodes = run["sizes"][rows] - 1
+    return nodes, run["ranks"][rows, nodes]
+
+def entry(nodes, m):
+    # Step at which each node entered, with the initial nodes sharing the
+    # mean step of the initial network, as in plots_ranks.ipynb
+    return np.where(nodes < m, (m + 1) / 2, nodes + 1)
+
+def alters(run):
+    """
+    The alters that each node selected on entry, with the step at which
+    each entered.
+
+    Parameters
+    ----------
+    run (dict): the run, as given by load().
+
+    Returns
+    -------
+    alters (dict): arrays of the "node", its "entry" step, the "direction"
+                   of the link ("in" from the alter or "out" to it), the
+                   "alter" and its "alter_entry" step, one per link.
+
+    """
+    edges, m = run["edges"], int(run["sizes"][0])
+    node = edges.max(axis=1)
+    keep = node >= m
+    edges, node = edges[keep], node[keep]
+    inward = edges[:, 1] == node
+    alter = np.where(inward, edges[:, 0], edges[:, 1])
+    return {"node":node, "entry":entry(node, m), "direction":np.where(inward, "in", "out"),
+            "alter":alter, "alter_entry":entry(alter, m)}
+
+def label(path):
+    # Setting and number of a run, from the layout of src.ensemble
+    name = os.path.basename(os.path.normpath(path))
+    match = re.match(r"run_(\d+)", name)
+    return os.path.basename(os.path.dirname(os.path.normpath(path))), int(match.group(1)) if match else None
+
+def ensemble(files, steps=(), cache_dir=None):
+    """
+    Tidy data frames of the rank trajectories, entrant ranks and alters of
+    every run of an ensemble, loading each run once.
+
+    Parameters
+    ----------
+    files (list): the runs, pickle files or run directories.
+    steps (list): the steps i whose entering nodes to follow.
+    cache_dir (str): the cache directory, or None not to cache.
+
+    Returns
+    -------
+    frames (dict): pandas data frames of the "trajectories", "entrants"
+                   and "alters", with the "network" setting and "run"
+                   number of each row.
+
+    """
+    import pandas as pd
+    frames = {"trajectories":[], "entrants":[], "alters":[]}
+    for path in files:
+        run = load(path, cache_dir)
+        keys = dict(zip(["network", "run"], label(path)))
+        for i, (rank, score) in trajectories(run, steps).items():
+            frames["trajectories"].append(pd.DataFrame({**keys, "i":i, "n":run["sizes"][i-1:], "rank":rank, "score":score}))
+        nodes, rank = entrants(run)
+        frames["entrants"].append(pd.DataFrame({**keys, "node":nodes, "rank":rank}))
+        frames["alters"].append(pd.DataFrame({**keys, **alters(run)}))
+    return {key: pd.concat(frame, ignore_index=True) if frame else pd.DataFrame() for key, frame in frames.items()}
@@ -2,22 +2,137 @@
 # coding: utf-8
 
 import os
+import time
+import pickle
 import random
 import numpy as np
 import networkx as nx
 
-from src.utils import directed_cycle_graph, disconnected_sticks, out_star
+from src.utils import directed_cycle_graph, disconnected_sticks, out_star, memory, FenwickTree
+from src.network import Network, Snapshots
 
-class Endogenous():
+class Hooks():
+
+    # Functions called with the event of each step, none by default
+    hooks = ()
+
+    def add_hook(self,hook):
+        # Call the hook with the event of each step, a dictionary of what happened in it
+        self.hooks = list(self.hooks) + [hook]
+        return None
+
+    def remove_hook(self,hook):
+        self.hooks = [h for h in self.hooks if h is not hook]
+        return None
+
+    def emit(self,event):
+        for hook in self.hooks:
+            hook(event)
+        return None
+
+    def __getstate__(self):
+        # Leave out the hooks, which need not be picklable
+        state = self.__dict__.copy()
+        state.pop("hooks",None)
+        return state
+
+class Checkpoints():
+
+    def checkpoint(self,file,node,N,every=None,seconds=None):
+        # Save the run so far, with the last node added and where the run is going
+        state = {"model":self,"node":node,"N":N,"every":every,"seconds":seconds}
+        # Write to a temporary file first so an interrupted save keeps the last checkpoint
+        with open(file + ".tmp","wb") as f:
+            pickle.dump(state,f,protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(file + ".tmp",file)
+        return None
+
+class Resources():
+
+    def close(self):
+        # Release what the model holds beyond its state, nothing by default
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+        return None
+
+class Growth():
+
+    def grow(self,N,checkpoint=None,every=None,seconds=None,node=None,recorder=None):
+        # Grow the network until it reaches size N, saving a checkpoint to
+        # the file every so many steps or seconds, if given. When resuming,
+        # node is the last node added. A recorder, if given, is kept to
+        # record the adjacent possible at each step
+        if recorder is not None:
+            recorder.start(self)
+            self.recorder = recorder
+        saved = time.monotonic()
+        for n, step in enumerate(self.iter_grow(N,node=node,keep=True)):
+            # Save a checkpoint, if one is due
+            if checkpoint is not None and ((every is not None and (n + 1) % every == 0) or
+                                           (seconds is not None and time.monotonic() - saved >= seconds)):
+                self.checkpoint(checkpoint,step["node"],N,every,seconds)
+                saved = time.monotonic()
+        return None
+
+    def iter_grow(self,N,reducers=(),node=None,keep=False):
+        # Grow the network until it reaches size N, yielding each step. Unless
+        # keep is set, networks keeps only the latest snapshot rather than all
+        for reducer in reducers:
+            reducer.start(self)
+        for n in range(N-len(self.nodes)):
+            step = self.step(node)
+            node = step["node"]
+            # Forget the earlier snapshots
+            if not keep:
+                del self.networks[:-1]
+            for reducer in reducers:
+                reducer.update(step)
+            yield step
+
+def resume(file,N=None,hooks=()):
+    """
+    Continue a run from its last checkpoint, as saved by grow, along the
+    same trajectory as if it had not been interrupted.
+
+    Parameters
+    ----------
+    file (str): the checkpoint file.
+    N (int): the size to grow the network to, defaults to that of the run.
+    hooks (list): functions to register as hooks of the run.
+
+    Returns
+    -------
+    model (Endogenous or Exogenous): the grown model.
+
+    """
+    with open(file,"rb") as f:
+        state = pickle.load(f)
+    model = state["model"]
+    for hook in hooks:
+        model.add_hook(hook)
+    N = state["N"] if N is None else N
+    model.grow(N,checkpoint=file,every=state["every"],seconds=state["seconds"],node=state["node"])
+    return model
+
+class Endogenous(Hooks,Checkpoints,Growth,Resources):
 
     name = "base"
     model = "Endogenous features growth model"
     specs = {}
+    # Recorder of the adjacent possible at each step, none by default
+    recorder = None
 
     def __init__(self):
-        self.G = nx.DiGraph()
+        self.G = Network()
         self.nodes = set()            
-        self.networks = []
+        self.networks = Snapshots(self.G)
+        self.rng = random.Random()
+        self.cache = {}
         return None
     
     def update(self,node=None): 
@@ -33,120 +148,199 @@ class Endogenous():
         raise NotImplementedError
     
     def join(self,pos):
-        # Add the new node to the graph
-        node = self.G.number_of_nodes()
-        self.G.add_node(node)
-        # Get all the edges of the given position
-        for source, target in set(self.G.in_edges(pos)):
-            # Add an edge from the source node to the new node
-            self.G.add_edge(source, node)
-        for source, target in set(self.G.out_edges(pos)):
-            # Add an edge from the new node to the target node
-            self.G.add_edge(node, target)
+        # Add the new node to the graph, with edges from the sources
+        # and to the targets of the given position
+        sources, targets = pos
+        node = self.G.join(sources, targets)
         # Update the set of existing nodes
         self.nodes.add(node)
         # Return the new node
         return node
     
-    def add_node(self):
-        # Explore the adjacent possible
+    def add_node(self,clock=None):
+        # Explore the adjacent possible, noting the time after each phase on the clock, if given
+        clock = [] if clock is None else clock
         V = self.explore()
-        # Select a position to join the network
+        clock.append(time.perf_counter())
+        # Select a position to join the network, recording the adjacent possible if asked
+        if self.recorder is not None:
+            scores = self.recorder.scores(V)
         pos = self.select(V)
+        if self.recorder is not None:
+            self.recorder.record(scores,pos)
+        clock.append(time.perf_counter())
         node = self.join(pos)
+        clock.append(time.perf_counter())
+        # Keep the position for scoring the snapshot
+        self.cache["position"] = pos
         # Return the node ID
         return node
+
+    def snapshot(self):
+        # Score the new snapshot
+        return self.score(self.G)
+
+    def step(self,node=None):
+        # Grow the network by one node, after the given node was added, and
+        # score the snapshot, telling the hooks, if any, how long each phase took
+        clock = [time.perf_counter()]
+        self.update(node=node)
+        clock.append(time.perf_counter())
+        node = self.add_node(clock)
+        self.networks.append(self.snapshot())
+        clock.append(time.perf_counter())
+        step = {"node":node,"n":len(self.nodes),"position":self.cache["position"],"scores":self.networks.scores[-1]}
+        if self.hooks:
+            # The adjacent possible is only updated at the next step, so it is the one the node joined from
+            candidates = len(self.space) if hasattr(self,"space") else None
+            event = dict(step,candidates=candidates)
+            event.update(zip(["update","explore","select","join","snapshot"],np.diff(clock).tolist()))
+            event["total"] = clock[-1] - clock[0]
+            event["iterations"] = {"explore":self.cache.get("explore_iterations"),"snapshot":self.cache.get("iterations")}
+            event["rss"] = memory()
+            self.emit(event)
+        self.cache = {}
+        return step
     
-    def grow(self,N):
-        # Grow the network until it reaches size N
-        node = None 
-        for n in range(N-len(self.nodes)):
-            # Update the adjacent possible
-            self.update(node=node)
-            # Grow the network
-            node = self.add_node()
-            # Score and store the snapshot
-            H = self.G.subgraph(self.nodes).copy()
-            nx.set_node_attributes(H, self.score(H), 'score')
-            self.networks.append(H)
-        return None
-    
-class Exogenous():
+class Exogenous(Hooks,Checkpoints,Growth,Resources):
 
     name = "base_pref"
     model = "Exogenous features growth model"
     specs = {}
 
     def __init__(self):
-        self.G = nx.DiGraph()
+        self.G = Network()
         self.nodes = set()            
-        self.networks = []
+        self.networks = Snapshots(self.G)
+        self.rng = random.Random()
+        self.cache = {}
+        return None
+
+    def weight(self,node):
+        # Weight of the node for preferential selection, relative to the scale degree,
+        # or the degree itself when gamma is one, which keeps the sums of the weights exact
+        if self.specs['gamma'] == 1:
+            return float(self.degree[node])
+        return (self.degree[node]/self.scale) ** self.specs['gamma']
+
+    def rescale(self):
+        # Take the maximum degree as the scale and rebuild the weights
+        self.scale = max(self.degree)
+        if self.specs['gamma'] is not None:
+            self.weights.rebuild(self.weight(node) for node in range(len(self.degree)))
         return None
 
     def appraise(self):
-        V = nx.degree_centrality(self.G)
+        # The weights of the existing nodes, rescaled when the maximum degree
+        # has doubled so that they stay within floating point range
+        if self.specs['gamma'] is not None and self.maxdeg > 2 * self.scale:
+            self.rescale()
+        V = self.weights
         return V
 
     def select(self,V):
-        max_score = max(V.values())
-        # Adjust the scores by the factor provided
         if self.specs['gamma'] is None:
-            alters = random.choices(list(V.keys()), k=2)
+            alters = self.rng.choices(range(len(self.degree)), k=2)
         else:
-            for node in V:
-                    V[node] = (V[node]/max_score) ** self.specs['gamma']
-            # Turn the scores into probabilities
-            total = sum(V.values())
-            probabilities = [v / total for v in V.values()]
-            # Sample a node from V with the given weights
-            alters = np.random.choice(list(V.keys()), size=2, replace=False, p=probabilities)
+            # Sample two distinct nodes with probability proportional to their weights
+            first = V.find(self.rng.random() * V.total())
+            weight = V.weights[first]
+            V.set(first, 0.0)
+            # Reject the first if the rounding of the partial sums still gives it, rebuilding them
+            second = first
+            while second == first:
+                if V.total() <= 0:
+                    V.set(first, weight)
+                    raise ValueError("Fewer than two nodes have a positive weight")
+                second = V.find(self.rng.random() * V.total())
+                if second == first:
+                    V.rebuild(V.weights)
+            V.set(first, weight)
+            alters = [first, second]
         return alters
     
     def join(self,alters):
-        # Add the new node to the graph
-        node = self.G.number_of_nodes()
-        self.G.add_node(node)
-        # Add the edges to the alter
-        self.G.add_edge(node, alters[0])
-        self.G.add_edge(alters[1], node)
+        # Add the new node to the graph, with an edge to the first alter and from the second
+        node = self.G.join([alters[1]], [alters[0]])
+        # Update the degrees, and the weights of the nodes whose degrees changed
+        self.degree.append(2)
+        self.degree[alters[0]] += 1
+        self.degree[alters[1]] += 1
+        self.maxdeg = max(self.maxdeg, self.degree[alters[0]], self.degree[alters[1]])
+        if self.specs['gamma'] is not None:
+            self.weights.append(self.weight(node))
+            for alter in set(alters):
+                self.weights.set(alter, self.weight(alter))
         # Update the set of existing nodes
         self.nodes.add(node)
-        # Return the new node
+        # Return the node ID
         return node
     
-    def add_node(self):
-        # Appraise the existing nodes
+    def add_node(self,clock=None):
+        # Appraise the existing nodes, noting the time after each phase on the clock, if given
+        clock = [] if clock is None else clock
         V = self.appraise()
+        clock.append(time.perf_counter())
         # Select nodes to connect with
         alters = self.select(V)
+        clock.append(time.perf_counter())
         node = self.join(alters)
+        clock.append(time.perf_counter())
+        # Keep the alters for the step
+        self.cache["alters"] = alters
         # Return the node ID
         return node
     
-    def grow(self,N):
-        # Grow the network until it reaches size N
-        node = None 
-        for n in range(N-len(self.nodes)):
-            # Grow the network
-            node = self.add_node()
-            # Score and store the snapshot
-            H = self.G.subgraph(self.nodes).copy()
-            nx.set_node_attributes(H, nx.degree_centrality(H), 'score')
-            self.networks.append(H)
-        return None
+    def snapshot(self):
+        # Score the new snapshot by degree centrality, from the degrees
+        n = len(self.degree)
+        s = 1.0 / (n - 1.0) if n > 1 else 1.0
+        return np.array(self.degree, dtype=float) * s
+
+    def step(self,node=None):
+        # Grow the network by one node and score the snapshot, telling the
+        # hooks, if any, how long each phase took
+        clock = [time.perf_counter()]
+        candidates = len(self.nodes)
+        node = self.add_node(clock)
+        self.networks.append(self.snapshot())
+        clock.append(time.perf_counter())
+        alters = self.cache["alters"]
+        # The new node links to the first alter and from the second
+        step = {"node":node,"n":len(self.nodes),"position":((alters[1],),(alters[0],)),"scores":self.networks.scores[-1]}
+        if self.hooks:
+            event = dict(step,candidates=candidates)
+            event.update(zip(["explore","select","join","snapshot"],np.diff(clock).tolist()))
+            event["total"] = clock[-1] - clock[0]
+            event["iterations"] = None
+            event["rss"] = memory()
+            self.emit(event)
+        self.cache = {}
+        return step
 
-    def __init__(self,m=2,select="random",gamma=1):
-        # Specify the specifications
+    def __init__(self,m=2,select="random",gamma=1,seed=None):
+        # Specify the specifications, on the instance so that they are saved with it
+        self.specs = dict(self.specs)
         self.specs["init"] = "cycle graph (m)"
         self.specs["score"] = "degree"
         self.specs["select"] = "exponential factor (gamma)" if select == "preferential" else select
         # Record the parameters
         self.specs["m"] = m
         self.specs["gamma"] = gamma if select == "preferential" else None
+        self.specs["seed"] = seed
+        # Create the random number generator of the run
+        self.rng = random.Random(seed)
         # Create the initial network
-        self.G = directed_cycle_graph(self.specs["m"])
+        G = directed_cycle_graph(self.specs["m"])
+        self.G = Network.from_networkx(G)
         self.nodes = set(self.G.nodes())
-        # Score and store the initial snapshots
-        nx.set_node_attributes(self.G, nx.degree_centrality(self.G), 'score')
-        self.networks = [self.G.copy()] * self.G.number_of_nodes()
+        # Score and store the initial snapshots, keeping only their scores
+        self.networks = Snapshots(self.G)
+        self.networks.extend([nx.degree_centrality(G)] * self.G.number_of_nodes())
+        # Keep the degrees, and the weights of preferential selection in a Fenwick tree
+        self.degree = (self.G.in_degree() + self.G.out_degree()).tolist()
+        self.maxdeg = max(self.degree)
+        self.weights = FenwickTree()
+        self.rescale()
+        self.cache = {}
         return None
\ No newline at end of file
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Benchmark suite for the growth models
+
+Grows each model under a fixed seed and records, through a hook on grow,
+the wall time of each phase of every step (update, explore, select, join
+and scoring the snapshot), the peak memory, traced in a second run of the
+same case so that tracing does not slow the timed run, the number of
+positions in the adjacent possible, the number of PageRank systems
+solved and, apart, the passes of the truncated iterations that only bound
+them. The results are written to a JSON file that the results of another
+commit can be compared against. The networkx engine, which runs nx.pagerank on every position,
+is the baseline path.
+
+Usage:
+    python -m src.benchmark run <results.json> [--models i1o1 pref] [--engines networkx lowrank] [--N 60]
+    python -m src.benchmark compare <old.json> <new.json>
+    python -m src.benchmark plot <results.json> <figure.png>
+
+Example:
+    python -m src.benchmark run bench.json --models i1o1 i1o2 --engines networkx lowrank batched --N 40
+"""
+
+import json
+import time
+import platform
+import argparse
+import functools
+import itertools
+import subprocess
+import tracemalloc
+import numpy as np
+import networkx as nx
+
+import src.models
+from src.base import Exogenous
+from src.ensemble import MODELS
+
+# Phases of a step, as timed in the events of grow
+PHASES = ["update", "explore", "select", "join", "snapshot", "total"]
+
+# Solvers of the models, with the number of PageRank systems each call solves: the
+# factor of the base network counts once, however it is found
+SOLVERS = {"pagerank":lambda W, *args, **kwargs: 1,
+           "pagerank_networkx":lambda G, sources, *args, **kwargs: len(sources),
+           "pagerank_factor":lambda W, *args, **kwargs: 1,
+           "pagerank_push":lambda W, *args, **kwargs: 1,
+           "pagerank_montecarlo":lambda W, *args, **kwargs: 1,
+           "pagerank_lowrank":lambda W, sources, *args, **kwargs: len(sources),
+           "pagerank_batched":lambda W, sources, *args, **kwargs: len(sources),
+           "pagerank_bounds":lambda W, sources, *args, **kwargs: 0,
+           "pagerank_warm":lambda W, sources, *args, **kwargs: len(sources)}
+
+# Solvers that only bound the PageRank systems by truncated iterations, which are
+# counted apart, as the number of iterations over all of the systems of each call
+PASSES = {"pagerank_bounds":lambda W, sources, targets, alpha, x0, iterations=10: len(sources) * iterations}
+
+class Counter():
+    """
+    Count the PageRank systems that the models solve, and the passes of
+    the iterations that only bound them, by wrapping the solvers that
+    src.models calls while in a with block.
+
+    """
+
+    def __init__(self):
+        self.solves = 0
+        self.passes = 0
+        self.solvers = {}
+        return None
+
+    def wrap(self, name, function):
+        @functools.wraps(function)
+        def counted(*args, **kwargs):
+            self.solves += SOLVERS[name](*args, **kwargs)
+            if name in PASSES:
+                self.passes += PASSES[name](*args, **kwargs)
+            return function(*args, **kwargs)
+        return counted
+
+    def __enter__(self):
+        for name in SOLVERS:
+            self.solvers[name] = getattr(src.models, name)
+            setattr(src.models, name, self.wrap(name, self.solvers[name]))
+        return self
+
+    def __exit__(self, *exc):
+        for name, function in self.solvers.items():
+            setattr(src.models, name, function)
+        return False
+
+def initialize(case):
+    # Initialize the model of the case
+    if case["model"] == "pref":
+        select = "random" if case["gamma"] is None else "preferential"
+        return Exogenous(m=case["m"], select=select, gamma=case["gamma"], seed=case["seed"])
+    kwargs = {"m":case["m"], "alpha":case["alpha"], "seed":case["seed"]}
+    if case["select"] == "random":
+        return MODELS[case["model"]](select="random", **kwargs)
+    return MODELS[case["model"]](select=case["select"], gamma=case["gamma"], engine=case["engine"], **kwargs)
+
+def measure(case, traced=False):
+    """
+    Grow the model of a case once, recording each step through a hook.
+
+    Parameters
+    ----------
+    case (dict): the case, as given by cases().
+    traced (bool): whether to trace the peak memory of each step rather
+                   than time it, as tracing slows the steps down.
+
+    Returns
+    -------
+    steps (list): a dictionary of measurements for each step.
+
+    """
+    steps = []
+    solves, passes = 0, 0
+    def record(event):
+        nonlocal solves, passes
+        if traced:
+            steps.append({"peak":tracemalloc.get_traced_memory()[1]})
+            tracemalloc.reset_peak()
+            return None
+        # Measurements of the step, with the size of the network it started from
+        step = {key: event[key] for key in PHASES + ["candidates", "rss"] if key in event}
+        step["n"] = event["n"] - 1
+        step["solves"], solves = counter.solves - solves, counter.solves
+        step["passes"], passes = counter.passes - passes, counter.passes
+        steps.append(step)
+    with initialize(case) as model:
+        model.add_hook(record)
+        if traced:
+            tracemalloc.start()
+        with Counter() as counter:
+            model.grow(case["N"])
+        if traced:
+            tracemalloc.stop()
+    return steps
+
+def profile(case, memory=False):
+    """
+    Grow the model of a case, timing each step with tracing off, and, if
+    asked, grow it again under the same seed to trace the peak memory of
+    each step.
+
+    Parameters
+    ----------
+    case (dict): the case, as given by cases().
+    memory (bool): whether to trace the peak memory of each step, in a
+                   second run.
+
+    Returns
+    -------
+    steps (list): a dictionary of measurements for each step.
+
+    """
+    steps = measure(case)
+    if memory:
+        # The second run follows the same trajectory, step for step
+        for step, traced in zip(steps, measure(case, traced=True)):
+            step["peak"] = traced["peak"]
+    return steps
+
+def exponent(steps, key="total"):
+    """
+    Scaling exponent of the cost of a step with the size of the network,
+    the slope of log cost against log n over the later half of the steps.
+
+    Parameters
+    ----------
+    steps (list): the measurements of each step, as given by profile().
+    key (str): the measurement.
+
+    Returns
+    -------
+    exponent (float): the fitted exponent, or None with too few steps.
+
+    """
+    steps = steps[len(steps)//2:]
+    n = np.array([step["n"] for step in steps], dtype=float)
+    cost = np.array([step[key] for step in steps], dtype=float)
+    keep = (n > 0) & (cost > 0)
+    if keep.sum() < 3:
+        return None
+    return float(np.polyfit(np.log(n[keep]), np.log(cost[keep]), 1)[0])
+
+def summarize(steps):
+    # Totals over the steps, and how the cost of a step scales
+    summary = {phase: float(sum(step.get(phase, 0.0) for step in steps)) for phase in PHASES}
+    summary["solves"] = int(sum(step["solves"] for step in steps))
+    summary["passes"] = int(sum(step.get("passes", 0) for step in steps))
+    summary["candidates"] = int(sum(step["candidates"] for step in steps))
+    if steps and "peak" in steps[0]:
+        summary["peak"] = int(max(step["peak"] for step in steps))
+    summary["exponent"] = exponent(steps)
+    summary["exponent_candidates"] = exponent(steps, "candidates")
+    return summary
+
+def cases(models=("i1o1",), m=(4,), engines=("networkx",), select="optimal", gamma=None, alpha=0.95, N=40, seed=0):
+    """
+    Every case of a benchmark grid. Exogenous is included as the model "pref",
+    and grows with one setting whatever the engines.
+
+    Parameters
+    ----------
+    models (list): labels of the models, keys of MODELS or "pref".
+    m (list): sizes of the initial cycle graph.
+    engines (list): the engines that score the adjacent possible.
+    select (str): the selection of the endogenous models.
+    gamma (float): the exponential factor of opportunistic or preferential selection.
+    alpha (float): the damping factor.
+    N (int): the size to grow each network to.
+    seed (int): the seed of every run.
+
+    Returns
+    -------
+    cases (list): a dictionary describing each case.
+
+    """
+    # Protest if opportunistic selection is asked for the endogenous models without its factor
+    if select == "opportunistic" and gamma is None and any(model != "pref" for model in models):
+        raise ValueError("Opportunistic selection needs a gamma")
+    grid = []
+    for model, m_ in itertools.product(models, m):
+        for engine in (["none"] if model == "pref" or select == "random" else engines):
+            grid.append({"model":model, "m":m_, "engine":engine, "select":select, "gamma":gamma,
+                         "alpha":alpha, "N":N, "seed":seed})
+    return grid
+
+def label(case):
+    # Name of the case
+    return "_".join([case["model"], "m"+str(case["m"]), case["select"], case["engine"]])
+
+def commit():
+    # The current commit, if known
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(grid, memory=True, verbose=True):
+    """
+    Run every case of a benchmark grid.
+
+    Parameters
+    ----------
+    grid (list): the cases, as given by cases().
+    memory (bool): whether to trace the peak memory of each step.
+    verbose (bool): whether to print a summary of each case.
+
+    Returns
+    -------
+    results (dict): the environment, and the steps and summary of each case.
+
+    """
+    results = {"meta":{"commit":commit(), "python":platform.python_version(), "numpy":np.__version__,
+                       "networkx":nx.__version__, "machine":platform.machine(), "memory":memory,
+                       "date":time.strftime("%Y-%m-%d %H:%M:%S")},
+               "cases":[]}
+    for case in grid:
+        steps = profile(case, memory=memory)
+        summary = summarize(steps)
+        results["cases"].append({"label":label(case), "case":case, "summary":summary, "steps":steps})
+        if verbose:
+            print("%-40s %9.3fs %9d solves  exponent %s" % (label(case), summary["total"], summary["solves"],
+                  "-" if summary["exponent"] is None else "%.2f" % summary["exponent"]))
+    return results
+
+def compare(old, new, keys=("total", "explore", "snapshot", "solves", "passes", "peak")):
+    """
+    Compare the results of two benchmark runs, case by case.
+
+    Parameters
+    ----------
+    old (dict): the earlier results, as given by run().
+    new (dict): the later results.
+    keys (list): the summary measurements to compare.
+
+    Returns
+    -------
+    rows (list): for each case in both runs, its label and the ratio new/old
+                 of each measurement.
+
+    """
+    before = {result["label"]: result["summary"] for result in old["cases"]}
+    rows = []
+    for result in new["cases"]:
+        if result["label"] not in before:
+            continue
+        ratios = {}
+        for key in keys:
+            a, b = before[result["label"]].get(key), result["summary"].get(key)
+            ratios[key] = None if a in [None, 0] or b is None else b / a
+        rows.append((result["label"], ratios))
+    return rows
+
+def plot(results, file, key="total"):
+    """
+    Plot the cost of a step against the size of the network for every
+    case, on log-log axes.
+
+    Parameters
+    ----------
+    results (dict): the results, as given by run().
+    file (str): the figure file.
+    key (str): the measurement to plot.
+
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(6, 4))
+    for result in results["cases"]:
+        steps = [step for step in result["steps"] if step[key] > 0]
+        ax.loglog([step["n"] for step in steps], [step[key] for step in steps], label=result["label"])
+    ax.set_xlabel("n")
+    ax.set_ylabel(key + (" (s)" if key not in ["solves", "passes", "candidates", "peak"] else ""))
+    ax.legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(file)
+    plt.close(fig)
+    return None
+
+def parse_gamma(gamma):
+    """Parse a gamma argument, keeping "none" as None."""
+    return None if gamma == "none" else float(gamma)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the growth steps of the models')
+    commands = parser.add_subparsers(dest='command', required=True)
+    bench = commands.add_parser('run', help='Run the benchmark and save the results')
+    bench.add_argument('out', help='Results file (JSON)')
+    bench.add_argument('--models', nargs='+', default=['i1o1', 'i1o2', 'i2o1', 'io3', 'i2o2', 'pref'], choices=list(MODELS) + ['pref'], help='Models to run (default: all)')
+    bench.add_argument('--m', nargs='+', type=int, default=[4], help='Sizes of the initial cycle graph (default: 4)')
+    bench.add_argument('--engines', nargs='+', default=['networkx', 'lowrank'], help='Engines that score the adjacent possible (default: networkx lowrank)')
+    bench.add_argument('--select', default='optimal', choices=['random', 'opportunistic', 'optimal'], help='Selection of the endogenous models (default: optimal)')
+    bench.add_argument('--gamma', type=parse_gamma, default=None, help='Exponential factor, or none (default: none)')
+    bench.add_argument('--alpha', type=float, default=0.95, help='Damping factor (default: 0.95)')
+    bench.add_argument('--N', type=int, default=40, help='Size to grow each network to (default: 40)')
+    bench.add_argument('--seed', type=int, default=0, help='Seed of every run (default: 0)')
+    bench.add_argument('--no-memory', action='store_true', help='Do not trace the peak memory, which takes a second run of each case')
+    bench.add_argument('--plot', default=None, help='Also plot the scaling curves to this figure')
+    versus = commands.add_parser('compare', help='Compare the results of two runs')
+    versus.add_argument('old', help='Earlier results file')
+    versus.add_argument('new', help='Later results file')
+    figure = commands.add_parser('plot', help='Plot the scaling curves of a run')
+    figure.add_argument('results', help='Results file')
+    figure.add_argument('out', help='Figure file')
+    figure.add_argument('--key', default='total', help='Measurement to plot (default: total)')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        if args.select == 'opportunistic' and args.gamma is None and any(model != 'pref' for model in args.models):
+            bench.error('--select opportunistic needs a --gamma')
+        grid = cases(args.models, args.m, args.engines, args.select, args.gamma, args.alpha, args.N, args.seed)
+        results = run(grid, memory=not args.no_memory)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=1)
+        if args.plot is not None:
+            plot(results, args.plot)
+    elif args.command == 'compare':
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        print("%-40s" % "case" + "".join("%12s" % key for key in ["total", "explore", "snapshot", "solves", "passes", "peak"]))
+        for name, ratios in compare(old, new):
+            print("%-40s" % name + "".join("%12s" % ("-" if ratio is None else "%.3fx" % ratio) for ratio in ratios.values()))
+    elif args.command == 'plot':
+        with open(args.results) as f:
+            plot(json.load(f), args.out, args.key)
+
+if __name__ == "__main__":
+    main()
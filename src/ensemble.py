@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Ensemble runner for the growth models
+
+Grows every run of a parameter grid across a pool of processes and saves
+each run to its own file. Each run draws from its own random number
+generator, seeded from a master seed and the identity of the run, so a
+run is reproducible on its own and does not depend on the rest of the
+grid. Runs whose output file already exists are skipped, so a sweep can
+be restarted after a crash without redoing work. With --checkpoint, each
+run also saves a checkpoint every so many steps, and a restarted sweep
+resumes unfinished runs from their checkpoints. Runs are saved either as
+pickled models or in the columnar run format of src.storage.
+
+Usage:
+    python -m src.ensemble <output_directory> [--models i1o1] [--gammas rnd 0 1 inf] [--runs 50] [--N 100] [--format pickle] [--checkpoint 100]
+
+Example:
+    python -m src.ensemble networks --models i1o1 --gammas rnd 0 1 2 inf --runs 10 --N 50 --workers 4
+"""
+
+import os
+import zlib
+import pickle
+import argparse
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.base import resume
+from src.storage import save_run
+from src.models import InOneOutOne, InOneOutTwo, InTwoOutOne, InOutThree, InTwoOutTwo
+
+MODELS = {"i1o1":InOneOutOne,
+          "i1o2":InOneOutTwo,
+          "i2o1":InTwoOutOne,
+          "io3":InOutThree,
+          "i2o2":InTwoOutTwo}
+
+def grid(models=("i1o1",), m=(3,), alpha=(0.95,), gammas=("rnd",), runs=1, N=100, engine="lowrank"):
+    """
+    Every run of a parameter grid. A gamma of "rnd" stands for random
+    selection, "inf" for optimal selection and a number for opportunistic
+    selection with that exponential factor.
+
+    Parameters
+    ----------
+    models (list): labels of the models, keys of MODELS.
+    m (list): sizes of the initial cycle graph.
+    alpha (list): damping factors.
+    gammas (list): selection settings.
+    runs (int or list): the number of runs, or the run numbers, of each setting.
+    N (int): the size to grow each network to.
+    engine (str): the engine that scores the adjacent possible.
+
+    Returns
+    -------
+    grid (list): a dictionary describing each run.
+
+    """
+    runs = range(runs) if isinstance(runs, int) else runs
+    return [{"model":model, "m":m_, "alpha":alpha_, "gamma":gamma, "run":run, "N":N, "engine":engine}
+            for model, m_, alpha_, gamma, run in itertools.product(models, m, alpha, gammas, runs)]
+
+def network(run):
+    # Name of the setting of the run, as in the notebooks
+    return "_".join([run["model"], "m"+str(run["m"]), "a"+str(run["alpha"]), "g"+str(run["gamma"])])
+
+def path(run, out_dir, fmt="pickle"):
+    # Output file of the run, or output directory in the columnar format
+    suffix = ".pkl" if fmt == "pickle" else ""
+    return os.path.join(out_dir, network(run), "run_"+str(run["run"])+suffix)
+
+def seed(run, master_seed=0):
+    """
+    Seed of the random number generator of a run, derived from the master
+    seed and the setting and number of the run.
+
+    Parameters
+    ----------
+    run (dict): the run, as given by grid().
+    master_seed (int): the seed of the whole ensemble.
+
+    Returns
+    -------
+    seed (int): the seed of the run.
+
+    """
+    key = (zlib.crc32(network(run).encode()), run["run"])
+    return int(np.random.SeedSequence(master_seed, spawn_key=key).generate_state(1, dtype=np.uint64)[0])
+
+def initialize(run, master_seed=0):
+    # Initialize the model of the run
+    cls = MODELS[run["model"]]
+    kwargs = {"m":run["m"], "alpha":run["alpha"], "seed":seed(run, master_seed)}
+    if run["gamma"] == "rnd":
+        return cls(select="random", **kwargs)
+    if run["gamma"] == "inf":
+        return cls(select="optimal", engine=run["engine"], **kwargs)
+    return cls(select="opportunistic", gamma=run["gamma"], engine=run["engine"], **kwargs)
+
+def grow(run, out_dir, master_seed=0, fmt="pickle", every=None):
+    """
+    Grow and save a single run, unless its output file already exists.
+
+    Parameters
+    ----------
+    run (dict): the run, as given by grid().
+    out_dir (str): the output directory.
+    master_seed (int): the seed of the whole ensemble.
+    fmt (str): the output format, "pickle" or "columnar".
+    every (int): save a checkpoint of the run every so many steps, and
+                 resume from it if it exists.
+
+    Returns
+    -------
+    file (str): the output file of the run.
+    done (bool): whether the run was grown now, rather than skipped.
+
+    """
+    file = path(run, out_dir, fmt)
+    if os.path.exists(file):
+        return file, False
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    checkpoint = file + ".ckpt"
+    resuming = every is not None and os.path.exists(checkpoint)
+    # Shut down the worker processes of the model, if any, once the run is saved
+    with (resume(checkpoint, run["N"]) if resuming else initialize(run, master_seed)) as model:
+        if not resuming:
+            model.grow(run["N"], checkpoint=None if every is None else checkpoint, every=every)
+        if fmt == "columnar":
+            save_run(model, file)
+        else:
+            # Write to a temporary file first so an interrupted run leaves no output
+            with open(file + ".tmp", "wb") as f:
+                pickle.dump(model, f)
+            os.replace(file + ".tmp", file)
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return file, True
+
+def run_ensemble(runs, out_dir, master_seed=0, workers=None, fmt="pickle", every=None):
+    """
+    Grow and save every run of a grid across a pool of processes.
+
+    Parameters
+    ----------
+    runs (list): the runs, as given by grid().
+    out_dir (str): the output directory.
+    master_seed (int): the seed of the whole ensemble.
+    workers (int): the number of processes, defaults to the number of CPUs.
+    fmt (str): the output format, "pickle" or "columnar".
+    every (int): save a checkpoint of each run every so many steps.
+
+    Returns
+    -------
+    files (list): the output file of each run.
+
+    """
+    files = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(grow, run, out_dir, master_seed, fmt, every) for run in runs]
+        for run, future in zip(runs, futures):
+            file, done = future.result()
+            print(("Grown: " if done else "Skipped: ") + file)
+            files.append(file)
+    return files
+
+def parse_gamma(gamma):
+    """Parse a gamma argument, keeping "rnd" and "inf" as they are."""
+    if gamma in ["rnd", "inf"]:
+        return gamma
+    return int(gamma) if gamma.lstrip("-").isdigit() else float(gamma)
+
+def main():
+    parser = argparse.ArgumentParser(description='Grow an ensemble of networks across a pool of processes')
+    parser.add_argument('out_dir', help='Output directory')
+    parser.add_argument('--models', nargs='+', default=['i1o1'], choices=list(MODELS), help='Models to run (default: i1o1)')
+    parser.add_argument('--m', nargs='+', type=int, default=[3], help='Sizes of the initial cycle graph (default: 3)')
+    parser.add_argument('--alpha', nargs='+', type=float, default=[0.95], help='Damping factors (default: 0.95)')
+    parser.add_argument('--gammas', nargs='+', type=parse_gamma, default=['rnd'], help='Selection settings: rnd, inf or a number (default: rnd)')
+    parser.add_argument('--runs', type=int, default=1, help='Number of runs of each setting (default: 1)')
+    parser.add_argument('--N', type=int, default=100, help='Size to grow each network to (default: 100)')
+    parser.add_argument('--engine', default='lowrank', help='Engine that scores the adjacent possible (default: lowrank)')
+    parser.add_argument('--seed', type=int, default=0, help='Master seed of the ensemble (default: 0)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of processes (default: number of CPUs)')
+    parser.add_argument('--format', default='pickle', choices=['pickle', 'columnar'], help='Output format (default: pickle)')
+    parser.add_argument('--checkpoint', type=int, default=None, help='Save a checkpoint of each run every so many steps (default: none)')
+
+    args = parser.parse_args()
+
+    runs = grid(args.models, args.m, args.alpha, args.gammas, args.runs, args.N, args.engine)
+    run_ensemble(runs, args.out_dir, master_seed=args.seed, workers=args.workers, fmt=args.format, every=args.checkpoint)
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,15 @@
 JPEG to GIF Converter (written with Claude AI)
 
 This script converts a directory of JPEG images into an animated GIF.
-It sorts the images by filename to ensure proper sequence.
+It sorts the images by filename to ensure proper sequence. The frames are
+streamed to the GIF writer: they are decoded and resized in a pool of
+threads, at most a few frames ahead of the writer, so memory does not grow
+with the number of frames. Frames can also be given directly as in-memory
+arrays, images or matplotlib figures with write_gif, so that animations
+from the plotting code never have to be saved as JPEGs first.
 
 Usage:
-    python jpeg_to_gif.py <input_directory> <output_file> [--fps 10] [--loop 0] [--quality 90] [--resize 800x600]
+    python jpeg_to_gif.py <input_directory> <output_file> [--fps 10] [--loop 0] [--quality 90] [--resize 800x600] [--workers 4] [--prefetch 8]
 
 Example:
     python jpeg_to_gif.py ./my_images output.gif --fps 15 --resize 640x480
@@ -18,15 +23,107 @@ Arguments:
     --loop           - Number of times to loop (0 = infinite, default: 0)
     --quality        - Quality of output GIF (1-100, default: 90)
     --resize         - Resize images to this dimension (e.g., 800x600)
+    --workers        - Number of threads decoding frames (default: number of CPUs)
+    --prefetch       - Number of frames decoded ahead of the writer (default: 8)
 """
 
+import io
 import os
 import glob
 import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from PIL import Image
 import imageio
 
-def create_gif(input_dir, output_file, fps=10, loop=0, quality=90, resize=None):
+def render_figure(fig, dpi=None, bbox_inches='tight'):
+    """Render a matplotlib figure in memory to PNG, as it would be saved."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches=bbox_inches)
+    buffer.seek(0)
+    return buffer
+
+def figure_to_array(fig, dpi=None, bbox_inches='tight'):
+    """Render a matplotlib figure in memory to an RGB array."""
+    with Image.open(render_figure(fig, dpi, bbox_inches)) as img:
+        return np.asarray(img.convert('RGB'))
+
+def prepare_frame(frame, resize=None):
+    """Decode and resize a frame, given as a file, array, image or matplotlib figure, to an RGB array."""
+    if hasattr(frame, 'savefig'):
+        frame = render_figure(frame)
+    if isinstance(frame, np.ndarray):
+        img = Image.fromarray(frame)
+    elif isinstance(frame, Image.Image):
+        img = frame
+    else:
+        img = Image.open(frame)
+    
+    # Resize if specified
+    if resize:
+        width, height = resize
+        img = img.resize((width, height), Image.LANCZOS)
+    
+    # Convert to RGB to handle RGBA or CMYK images
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    
+    # Decode the whole frame here, in the worker thread
+    return np.asarray(img)
+
+def stream_frames(frames, resize=None, workers=None, prefetch=8):
+    """
+    Prepare frames in a pool of threads, yielding them in order.
+
+    At most prefetch frames are decoded ahead of the one being yielded, so
+    only those are held in memory. Frames that cannot be prepared are
+    reported and skipped.
+    """
+    def prepare(frame):
+        try:
+            return prepare_frame(frame, resize)
+        except Exception as e:
+            print(f"Error processing {frame if isinstance(frame, (str, os.PathLike)) else 'frame'}: {e}")
+            return None
+    
+    frames = iter(frames)
+    # One thread per CPU by default, as the --workers help says
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        # Keep the queue of frames being decoded full, and hand them over in order
+        for frame in frames:
+            # Matplotlib is not thread-safe, so figures are rendered here and only decoded in the threads
+            if hasattr(frame, 'savefig'):
+                frame = render_figure(frame)
+            pending.append(executor.submit(prepare, frame))
+            if len(pending) >= max(prefetch, 1):
+                img = pending.popleft().result()
+                if img is not None:
+                    yield img
+        while pending:
+            img = pending.popleft().result()
+            if img is not None:
+                yield img
+
+def write_gif(frames, output_file, fps=10, loop=0, quality=90, resize=None, workers=None, prefetch=8):
+    """
+    Write frames to an animated GIF as they are prepared.
+
+    The frames can be image files, numpy arrays, PIL images or matplotlib
+    figures, in any iterable, including a generator that draws each frame
+    only when it is needed (and may close each figure once it is handed
+    over). Returns the number of frames written.
+    """
+    count = 0
+    with imageio.get_writer(output_file, mode='I', duration=1/fps, loop=loop, quality=quality) as writer:
+        for img in stream_frames(frames, resize=resize, workers=workers, prefetch=prefetch):
+            writer.append_data(img)
+            count += 1
+    return count
+
+def create_gif(input_dir, output_file, fps=10, loop=0, quality=90, resize=None, workers=None, prefetch=8):
     """Convert a directory of JPEG images to an animated GIF."""
     print(f"Creating GIF from images in {input_dir}...")
     
@@ -52,43 +149,24 @@ def create_gif(input_dir, output_file, fps=10, loop=0, quality=90, resize=None):
     
     print(f"Found {len(image_files)} JPEG images")
     
-    # Prepare images
-    images = []
-    for image_file in image_files:
-        try:
-            img = Image.open(image_file)
-            
-            # Resize if specified
-            if resize:
-                width, height = resize
-                img = img.resize((width, height), Image.LANCZOS)
-            
-            # Convert to RGB to handle RGBA or CMYK images
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-                
-            images.append(img)
-        except Exception as e:
-            print(f"Error processing {image_file}: {e}")
-    
-    if not images:
-        print("No valid images could be processed")
-        return False
-    
-    # Save as GIF
+    # Stream the images into the GIF, decoding them ahead of the writer
     try:
         print(f"Creating GIF with {fps} frames per second...")
-        with imageio.get_writer(output_file, mode='I', duration=1/fps, loop=loop, quality=quality) as writer:
-            for img in images:
-                # Convert PIL Image to numpy array
-                writer.append_data(imageio.core.asarray(img))
-        
-        print(f"GIF successfully created: {output_file}")
-        print(f"GIF contains {len(images)} frames at {fps} FPS")
-        return True
+        count = write_gif(image_files, output_file, fps=fps, loop=loop, quality=quality,
+                          resize=resize, workers=workers, prefetch=prefetch)
     except Exception as e:
         print(f"Error creating GIF: {e}")
         return False
+    
+    if not count:
+        print("No valid images could be processed")
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        return False
+    
+    print(f"GIF successfully created: {output_file}")
+    print(f"GIF contains {count} frames at {fps} FPS")
+    return True
 
 def parse_resize(resize_str):
     """Parse the resize argument from string to tuple of integers."""
@@ -108,6 +186,8 @@ def main():
     parser.add_argument('--loop', type=int, default=0, help='Number of times to loop (0 = infinite, default: 0)')
     parser.add_argument('--quality', type=int, default=90, help='Quality of output GIF (1-100, default: 90)')
     parser.add_argument('--resize', type=parse_resize, help='Resize images to this dimension (e.g., 800x600)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of threads decoding frames (default: number of CPUs)')
+    parser.add_argument('--prefetch', type=int, default=8, help='Number of frames decoded ahead of the writer (default: 8)')
     
     args = parser.parse_args()
     
@@ -131,7 +211,9 @@ def main():
         fps=args.fps, 
         loop=args.loop, 
         quality=args.quality,
-        resize=args.resize
+        resize=args.resize,
+        workers=args.workers,
+        prefetch=args.prefetch
     )
 
 if __name__ == "__main__":
@@ -2,106 +2,396 @@
 # coding: utf-8
 
 import os
+import copy
+import time
 import random
+import weakref
+import functools
+import itertools
 import numpy as np
 import networkx as nx
-import itertools
+from concurrent.futures import ProcessPoolExecutor
 
 from src.base import Endogenous
-from src.utils import softmax, directed_cycle_graph, disconnected_sticks, out_star
+from src.motifs import MOTIFS
+from src.space import AdjacentPossible, Candidates, descriptors, equivalence
+from src.network import Network, Snapshots
+from src.parallel import score_groups, split
+from src.utils import softmax, choose, directed_cycle_graph, disconnected_sticks, out_star
+from src.pagerank import pagerank, pagerank_networkx, pagerank_factor, pagerank_push, pagerank_montecarlo, pagerank_lowrank, pagerank_batched, pagerank_bounds, pagerank_warm, warm_start, power_iteration
 
 class InOneOutOne(Endogenous):
 
     name = "i1o1"
     specs = {"update":"in-one-out-one"}
+    motif = MOTIFS["i1o1"]
+
+    @property
+    def alters(self):
+        # Number of alters of a node in each of its positions
+        return self.motif.alters
 
     def update(self,node=None):
         # If no node is specified, consider possibilities among all nodes
         if node is None:
-            # If there are not already potential nodes in G
-            if self.G.nodes() - self.nodes == set():
-                # Populate the adjacent possible
-                sources = set(self.nodes)
-                targets = set(self.nodes)
-                for source in sources:
-                    for target in targets:
-                        if source != target:
-                            pos = self.G.number_of_nodes()
-                            self.G.add_edge(source,pos)
-                            self.G.add_edge(pos,target)
+            # If the adjacent possible is not already populated
+            if len(self.space) == 0:
+                # Populate the adjacent possible with the positions among the initial nodes
+                self.space.seed(*self.motif.initial(self.nodes))
         # Otherwise, only consider possibilities involving the specified node
         else:
             # Protest if the node is outside the network
             assert node in self.G
             assert node in self.nodes
-            # Get the alters of the node
-            alters = set(self.nodes) - set([node])
-            for alter in alters:
-                # Add downstream positions
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(node,pos)
-                self.G.add_edge(pos,alter)
-                # Add upstream positions
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(alter,pos)
-                self.G.add_edge(pos,node)
+            # Generate its positions with the older nodes on demand
+            self.space.add(node)
         return None
+
+    def positions(self,node,alters):
+        # Positions involving the node for each combination of alters, as laid out by the motif
+        return self.motif.positions(node,alters)
+
+    def rewind(self,n):
+        # A copy of the model as it was when its network had n nodes, with the
+        # adjacent possible of the node that joined next, ready to explore
+        model = copy.copy(self)
+        model.G = self.G.head(n)
+        model.nodes = set(model.G.nodes())
+        model.networks = Snapshots(model.G)
+        model.networks.extend([x for x in self.networks.scores if len(x) <= n])
+        model.space = AdjacentPossible(model)
+        model.space.seeds = list(self.space.seeds)
+        model.space.nodes = list(range(self.specs["m"],n))
+        # Keep the generators, statistics and workers of the run apart
+        model.rng, model.generator = copy.deepcopy(self.rng), copy.deepcopy(self.generator)
+        model.iterations, model.errors, model.pruned, model.proposals, model.shared = [], [], [], [], []
+        model.executor, model.finalizer, model.recorder, model.cache = None, None, None, {}
+        # Bind the selection and exploration to the copy
+        model.select, model.explore = getattr(model,self.select.__name__), getattr(model,self.explore.__name__)
+        return model
     
     def score(self,G):
         # Calculate the PageRank scores
+        if isinstance(G,Network):
+            x, _ = pagerank(G.transition(),self.specs["alpha"],max_iter=1000)
+            return dict(enumerate(x.tolist()))
         scores = nx.pagerank(G,alpha=self.specs["alpha"],max_iter=1000)
         return scores
 
+    def snapshot(self):
+        # Score the new snapshot from what the explore phase kept of the base network
+        cache = self.cache
+        if "W" not in cache:
+            x, cache["iterations"] = pagerank(self.G.transition(),self.specs["alpha"],max_iter=1000)
+            return x
+        sources, targets = (np.array([nodes],dtype=np.intp) for nodes in cache["position"])
+        # The factor of the base network gives the scores of the selected position without solving
+        if "factor" in cache:
+            x = pagerank_lowrank(cache["W"],sources,targets,self.specs["alpha"],factor=cache["factor"],full=True)
+            cache["iterations"] = 0
+            return x[0]
+        # Otherwise start a single solve from the scores of the base network
+        x0 = warm_start(cache["W"],sources,self.specs["alpha"],self.networks.scores[-1])
+        x, cache["iterations"] = pagerank(self.G.transition(),self.specs["alpha"],x0=x0[0],max_iter=1000)
+        return x
+
     def explore_random(self):
-        # Set of positions in the adjacent possible
-        V = set(self.G.nodes()) - set(self.nodes)
+        # The adjacent possible, to sample from
+        V = self.space
         return V
 
     def select_random(self,V):
         # Select a random position from the adjacent possible
-        node = random.choices(list(V),k=1)[0]
-        return node
+        pos = V.sample()
+        return pos
+
+    def map(self,function):
+        # Score the positions group by group with the base network bound to the function,
+        # scoring one position of each class of equivalent positions
+        groups = self.classes(self.space.groups(self.specs["chunk_size"],index=True))
+        if self.specs["workers"] is None:
+            for sources, targets, index, first, inverse in groups:
+                yield sources, targets, index, function(sources[first],targets[first])[inverse]
+            return None
+        # Otherwise, ship the base network once to each worker with its share of the groups
+        if getattr(self,"executor",None) is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.specs["workers"])
+            # Shut the pool down once the model is dropped, if it is not closed before
+            self.finalizer = weakref.finalize(self,self.executor.shutdown)
+        groups = list(groups)
+        parts = split([(sources[first],targets[first]) for sources, targets, index, first, inverse in groups],self.specs["workers"])
+        futures = [self.executor.submit(score_groups,function,part) for part in parts]
+        results = itertools.chain.from_iterable(future.result() for future in futures)
+        for (sources, targets, index, first, inverse), scores in zip(groups,results):
+            yield sources, targets, index, scores[inverse]
+        return None
+
+    def classes(self,groups):
+        # Without deduplication, every position is its own class
+        if not self.specs["dedup"]:
+            for sources, targets, index in groups:
+                yield sources, targets, index, slice(None), slice(None)
+            return None
+        # Otherwise, find the structural twins and, optionally, some automorphisms of the network
+        labels = self.G.twins()
+        automorphisms = []
+        if self.specs["orbits"]:
+            matcher = nx.algorithms.isomorphism.DiGraphMatcher(*[self.G.to_networkx()]*2)
+            for mapping in itertools.islice(matcher.isomorphisms_iter(),self.specs["orbits"]):
+                automorphisms.append(np.array([mapping[node] for node in range(self.G.number_of_nodes())],dtype=np.intp))
+        candidates, scored = 0, 0
+        for sources, targets, index in groups:
+            first, inverse = equivalence(labels,sources,targets,automorphisms)
+            candidates, scored = candidates + len(sources), scored + len(first)
+            yield sources, targets, index, first, inverse
+        # Record how many positions were scored for the classes
+        self.shared.append({"candidates":candidates,"scored":scored})
+        return None
+
+    def close(self):
+        # Shut down the worker processes, if any
+        if getattr(self,"executor",None) is not None:
+            self.finalizer()
+            self.executor = None
+        return None
+
+    def __getstate__(self):
+        # Leave out the worker processes
+        state = super().__getstate__()
+        state.pop("executor",None)
+        state.pop("finalizer",None)
+        return state
 
     def explore_opportunistic(self):
-        V = {}
-        possibilities = self.G.nodes() - self.nodes
-        for pos in possibilities: # TODO: experiment
-            H = self.G.subgraph(self.nodes | {pos})
-            V[pos] = self.score(H)[pos]
+        H = self.G.to_networkx()
+        self.cache["W"] = self.G.transition()
+        V = Candidates(self.map(functools.partial(pagerank_networkx,H,alpha=self.specs["alpha"]))) # TODO: experiment
+        return V
+
+    def explore_lowrank(self):
+        # Factorize the existing network once
+        W = self.G.transition()
+        factor = pagerank_factor(W,self.specs["alpha"])
+        self.cache.update({"W":W,"factor":factor})
+        # Score every position as a low-rank update of the existing network
+        V = Candidates(self.map(functools.partial(pagerank_lowrank,W,alpha=self.specs["alpha"],factor=factor)))
+        return V
+
+    def explore_batched(self):
+        W = self.G.transition()
+        self.cache["W"] = W
+        # Score the positions by power iteration on all of them at once
+        V = Candidates(self.map(functools.partial(pagerank_batched,W,alpha=self.specs["alpha"])))
+        return V
+
+    def explore_push(self):
+        W = self.G.transition()
+        self.cache["W"] = W
+        # Push the rows of the factor of the existing network that the positions need, as they need them
+        start = time.perf_counter()
+        factor = pagerank_push(W,self.specs["alpha"],self.specs["epsilon"])
+        V = Candidates(self.map(functools.partial(pagerank_lowrank,W,alpha=self.specs["alpha"],factor=factor)))
+        self.estimate(W,V,factor[0].bound(),time.perf_counter()-start)
+        return V
+
+    def estimate(self,W,V,error,seconds):
+        # Record the error of an entry of the approximate factor, the largest so far in the specs
+        record = {"error":error,"time":seconds,"measured":None,"exact_time":None}
+        self.specs["error"] = max(self.specs["error"] or 0.0,error)
+        # Compare against the exact scores while the network is small enough
+        if self.specs["compare"] is not None and W.shape[0] <= self.specs["compare"]:
+            start = time.perf_counter()
+            factor = pagerank_factor(W,self.specs["alpha"])
+            measured = 0.0
+            for sources, targets, index in self.space.groups(self.specs["chunk_size"],index=True):
+                exact = pagerank_lowrank(W,sources,targets,self.specs["alpha"],factor=factor)
+                measured = max(measured,np.max(np.abs(V.scores[index] - exact) / exact))
+            record["measured"], record["exact_time"] = float(measured), time.perf_counter() - start
+            # Record the largest relative error of a score so far
+            self.specs["measured"] = max(self.specs["measured"] or 0.0,record["measured"])
+        self.errors.append(record)
+        return None
+
+    def explore_montecarlo(self):
+        W = self.G.transition()
+        self.cache["W"] = W
+        # Estimate the factor of the existing network from a budget of random walks
+        start = time.perf_counter()
+        M, y, error = pagerank_montecarlo(W,self.specs["alpha"],self.specs["walks"],self.generator)
+        V = Candidates(self.map(functools.partial(pagerank_lowrank,W,alpha=self.specs["alpha"],factor=(M,y))))
+        self.estimate(W,V,error,time.perf_counter()-start)
+        return V
+
+    def explore_bound(self):
+        W = self.G.transition()
+        self.cache["W"] = W
+        alpha = self.specs["alpha"]
+        size = self.specs["chunk_size"] or 100
+        # Start every position from the flow of its sources in the existing network
+        groups = list(self.space.groups(self.specs["chunk_size"],index=True))
+        candidates = sum(len(sources) for sources, targets, index in groups)
+        alive = [np.arange(len(sources)) for sources, targets, index in groups]
+        X = [warm_start(W,sources,alpha,self.networks.scores[-1]) for sources, targets, index in groups]
+        upper = [np.full(len(sources),np.inf) for sources, targets, index in groups]
+        best = -np.inf
+        # Tighten the bounds a few iterations at a time, pruning the positions that cannot reach the best
+        floor = 2 * alpha / (1 - alpha) * (W.shape[0] + 1) * 1.0e-6
+        for iteration in range(0, 1000, self.specs["rounds"]):
+            width = 0.0
+            for g, (sources, targets, index) in enumerate(groups):
+                if len(alive[g]) > 0:
+                    X[g], lower, upper[g] = pagerank_bounds(W,sources[alive[g]],targets[alive[g]],alpha,X[g],self.specs["rounds"])
+                    best = max(best,lower.max())
+                    width = max(width,np.max(upper[g] - lower))
+            # Keep the positions within the tolerance of ties of select_optimal of the best
+            for g in range(len(groups)):
+                keep = upper[g] >= best * (1 - 1e-9)
+                alive[g], X[g], upper[g] = alive[g][keep], X[g][keep], upper[g][keep]
+            if sum(len(a) for a in alive) <= size or width <= floor:
+                break
+        # Score the survivors to machine precision, so that ties are kept as by the exact engines,
+        # highest upper bound first
+        group = np.concatenate([np.full(len(a),g) for g, a in enumerate(alive)])
+        row = np.concatenate(alive)
+        bound = np.concatenate(upper)
+        order = np.argsort(-bound,kind="stable")
+        scored = []
+        for start in range(0, len(order), size):
+            batch = order[start:start+size]
+            batch = batch[bound[batch] >= best * (1 - 1e-9)]
+            if len(batch) == 0:
+                break
+            for g in np.unique(group[batch]):
+                rows = np.sort(row[batch[group[batch] == g]])
+                sources, targets, index = (array[rows] for array in groups[g])
+                scores = pagerank_batched(W,sources,targets,alpha,tol=1.0e-15)
+                scored.append((sources,targets,index,scores))
+                best = max(best,scores.max())
+        # Keep the positions in the order of the adjacent possible, for breaking ties
+        V = Candidates(scored)
+        # Record how many positions were pruned without scoring
+        self.pruned.append({"candidates":int(candidates),"scored":len(V),"pruned":int(candidates) - len(V)})
+        return V
+
+    def explore_sample(self):
+        W = self.G.transition()
+        self.cache["W"] = W
+        alpha, gamma = self.specs["alpha"], self.specs["gamma"]
+        # Start every position from the flow of its sources in the existing network
+        groups = list(self.space.groups(self.specs["chunk_size"],index=True))
+        X = [warm_start(W,sources,alpha,self.networks.scores[-1]) for sources, targets, index in groups]
+        lower = [np.zeros(len(sources)) for sources, targets, index in groups]
+        upper = [np.full(len(sources),np.inf) for sources, targets, index in groups]
+        loose = [np.arange(len(sources)) for sources, targets, index in groups]
+        # Bound every position after a single iteration, then tighten the bounds of the loose positions
+        # a few iterations at a time until the proposal is accepted at least half of the time
+        floor = 2 * alpha / (1 - alpha) * (W.shape[0] + 1) * 1.0e-6
+        rounds, iterations = 1, 0
+        while iterations < 1000:
+            for g, (sources, targets, index) in enumerate(groups):
+                if len(loose[g]) > 0:
+                    i = loose[g]
+                    X[g][i], lower[g][i], upper[g][i] = pagerank_bounds(W,sources[i],targets[i],alpha,X[g][i],rounds)
+            iterations, rounds = iterations + rounds, self.specs["rounds"]
+            # Only the positions that leave the most slack between the bounds of their weights
+            scale = max(u.max() for u in upper)
+            low = [(np.clip(l,0,None) / scale) ** gamma for l in lower]
+            slack = [(u / scale) ** gamma - w for u, w in zip(upper,low)]
+            mass = sum(w.sum() for w in low)
+            if sum(d.sum() for d in slack) <= mass:
+                break
+            loose = [np.flatnonzero((d > mass / len(d)) & (u - l > floor)) for d, u, l in zip(slack,upper,lower)]
+            if sum(len(i) for i in loose) == 0:
+                break
+        # Hand over the upper bounds as the scores, for select_sample to propose from
+        V = Candidates((sources,targets,index,u) for (sources, targets, index), u in zip(groups,upper))
+        return V
+
+    def explore_warm(self):
+        W = self.G.transition()
+        self.cache["W"] = W
+        # Start from the scores of the existing network, kept with its snapshot
+        x = self.networks.scores[-1]
+        # Only solve as precisely as the selection needs
+        gamma = np.inf if self.specs["select"] == "optimal" else self.specs["gamma"]
+        used, best = 0, -np.inf
+        groups, scored = [], []
+        # Score one position of each class of equivalent positions, if asked
+        for sources, targets, index, first, inverse in self.classes(self.space.groups(self.specs["chunk_size"],index=True)):
+            scores, iterations, best = pagerank_warm(W,sources[first],targets[first],self.specs["alpha"],x,gamma=gamma,
+                                                     precision=self.specs["precision"],best=best)
+            groups.append((sources,targets,index,scores[inverse]))
+            scored.append((sources[first],targets[first]))
+            used = used + iterations.sum()
+        V = Candidates(groups)
+        record = {"used":int(used),"cold":None,"saved":None}
+        # Measure the iterations of cold starts of the same positions while the network is small enough
+        if self.specs["compare"] is not None and W.shape[0] <= self.specs["compare"]:
+            cold = sum(int(power_iteration(W,sources,targets,self.specs["alpha"])[1].sum()) for sources, targets in scored)
+            record["cold"], record["saved"] = cold, cold - int(used)
+        self.iterations.append(record)
+        self.cache["explore_iterations"] = int(used)
         return V
 
     def select_opportunistic(self,V):
-        max_score = max(V.values())
-        # Adjust the scores by the factor provided
+        # Clip the estimates of the approximate engines that fall below zero, which are never selected
+        weights = np.clip(V.scores,0,None)
+        # Protest if no position can be selected
+        if not np.any(weights > 0):
+            raise ValueError("No position of the adjacent possible has a positive score")
+        # Adjust the scores by the factor provided, relative to the largest so that they stay within range
         if self.specs['gamma'] != 1:
-            for node in V:
-                V[node] = (V[node]/max_score) ** self.specs['gamma']
-        # Turn the scores into probabilities
-        total = sum(V.values())
-        probabilities = [v / total for v in V.values()]
-        # Sample a node from V with the probabilities
-        node = random.choices(list(V.keys()), weights=probabilities, k=1)[0]
+            with np.errstate(divide="ignore"):
+                weights = np.where(weights > 0,(weights / weights.max()) ** self.specs['gamma'],0.0)
+        # Sample a position from V with probability proportional to the weights
+        node = V.position(choose(weights,self.rng.random()))
         return node
     
+    def select_sample(self,V):
+        # Propose positions with probability proportional to the upper bounds of their weights,
+        # which explore_sample hands over as the scores
+        gamma = self.specs["gamma"]
+        scale = V.scores.max()
+        bounds = (V.scores / scale) ** gamma
+        weights = np.cumsum(bounds).tolist()
+        scores = {}
+        proposals = 0
+        while True:
+            proposals += 1
+            i = self.rng.choices(range(len(weights)),cum_weights=weights,k=1)[0]
+            pos = V.position(i)
+            if i not in scores:
+                sources, targets = (np.array([nodes],dtype=np.intp) for nodes in pos)
+                scores[i] = pagerank_batched(self.cache["W"],sources,targets,self.specs["alpha"])[0]
+            # Accept with the ratio of the weight to its upper bound
+            if self.rng.random() * bounds[i] < (scores[i] / scale) ** gamma:
+                break
+        # Record how many positions were scored exactly
+        self.proposals.append({"candidates":len(V),"proposed":proposals,"scored":len(scores)})
+        return pos
+
     def select_optimal(self,V):
-        # Select randomly among the nodes with the maximum score
-        max_score = max(V.values())
-        max_nodes = [k for k, v in V.items() if v == max_score]
-        node = random.choices(max_nodes,k=1)[0]
+        # Select randomly among the positions with the maximum score, up to the
+        # rounding of the engines that do not solve each position from scratch
+        max_nodes = np.flatnonzero(np.isclose(V.scores,V.scores.max(),rtol=1e-9,atol=0))
+        node = V.position(max_nodes[int(self.rng.random() * len(max_nodes))])
         return node
 
     def select_softmax(self,V):
         # Turn the scores into probabilities
-        possibilities = list(V.keys())
-        probabilities = softmax(list(V.values()),self.specs["gamma"])
-        # Sample a node from V with the probabilities
-        node = random.choices(possibilities, weights=probabilities, k=1)[0]
+        probabilities = softmax(V.scores,self.specs["gamma"])
+        # Sample a position from V with the probabilities
+        node = V.position(choose(probabilities,self.rng.random()))
         return node
 
-    def __init__(self,m=3,select="random",alpha=0.95,gamma=None):
-        # Specify the specifications
+    def __init__(self,m=3,select="random",alpha=0.95,gamma=None,engine="networkx",chunk_size=None,precision=1e-3,epsilon=1e-4,compare=None,walks=10000,rounds=10,dedup=False,orbits=0,workers=None,motif=None,seed=None):
+        # Specify the specifications, on the instance so that they are saved with it
+        self.specs = dict(self.specs)
+        # Grow with the given motif instead of that of the model, if any
+        if motif is not None:
+            self.motif = motif
+            self.name = motif.name
+            self.specs["update"] = motif.update
         self.specs["init"] = "cycle graph (m)"
         self.specs["score"] = "pagerank (alpha)"
         self.specs["select"] = "exponential factor (gamma)" if select == "opportunistic" else select
@@ -109,236 +399,87 @@ class InOneOutOne(Endogenous):
         self.specs["m"] = m
         self.specs["alpha"] = alpha
         self.specs["gamma"] = gamma if select == "opportunistic" else None
+        self.specs["engine"] = engine if select != "random" else None
+        self.specs["chunk_size"] = chunk_size if select != "random" else None
+        self.specs["precision"] = precision if engine == "warm" else None
+        self.specs["epsilon"] = epsilon if engine == "push" else None
+        self.specs["compare"] = compare if engine in ["warm","push","montecarlo"] else None
+        self.specs["walks"] = walks if engine == "montecarlo" else None
+        self.specs["rounds"] = rounds if engine in ["bound","sample"] else None
+        self.specs["dedup"] = dedup if select != "random" else None
+        self.specs["orbits"] = orbits if dedup and select != "random" else None
+        self.specs["error"] = None
+        self.specs["measured"] = None
+        self.specs["workers"] = workers if select != "random" else None
+        self.specs["seed"] = seed
+        # Protest if the positions cannot be scored independently, or the push of their rows would be lost in the workers
+        if self.specs["workers"] is not None and engine in ["warm","push","bound","sample"]:
+            raise ValueError("The %s engine does not support workers" % engine)
+        # Protest if the positions are pruned for a selection that needs all of them
+        if engine == "bound" and select != "optimal":
+            raise ValueError("The bound engine only supports optimal selection")
+        if engine == "sample" and (select != "opportunistic" or gamma is None or gamma < 0):
+            raise ValueError("The sample engine only supports opportunistic selection with a non-negative gamma")
+        # Protest if the positions are not scored one by one, so that classes of them cannot share a score
+        if dedup and engine in ["bound","sample"]:
+            raise ValueError("The %s engine does not support dedup" % engine)
         # Define the functions for the model
         selector = {"random":self.select_random,
                     "opportunistic":self.select_opportunistic,
                     "optimal":self.select_optimal}
+        engines = {"networkx":self.explore_opportunistic,
+                   "lowrank":self.explore_lowrank,
+                   "batched":self.explore_batched,
+                   "warm":self.explore_warm,
+                   "push":self.explore_push,
+                   "montecarlo":self.explore_montecarlo,
+                   "bound":self.explore_bound,
+                   "sample":self.explore_sample}
         explorer = {"random":self.explore_random,
-                    "opportunistic":self.explore_opportunistic,
-                    "optimal":self.explore_opportunistic}
+                    "opportunistic":engines[engine],
+                    "optimal":engines[engine]}
+        if engine == "sample":
+            selector["opportunistic"] = self.select_sample
         self.select = selector[select]
         self.explore = explorer[select]
+        # Create the random number generators of the run
+        self.rng = random.Random(seed)
+        self.generator = np.random.default_rng(seed)
         # Create the initial network
-        self.G = directed_cycle_graph(self.specs["m"])
+        self.G = Network.from_networkx(directed_cycle_graph(self.specs["m"]))
         self.nodes = set(self.G.nodes())
         # Score and store the initial snapshots
-        nx.set_node_attributes(self.G, self.score(self.G), 'score')
-        self.networks = [self.G.copy()] * self.G.number_of_nodes()
+        self.networks = Snapshots(self.G)
+        self.networks.extend([self.score(self.G)] * self.G.number_of_nodes())
+        self.space = AdjacentPossible(self)
+        self.iterations = []
+        self.errors = []
+        self.pruned = []
+        self.proposals = []
+        self.shared = []
+        self.cache = {}
         return None
     
 class InOneOutTwo(InOneOutOne):
 
     name = "i1o2"
     specs = {"update":"in-one-out-two"}
-
-    def update(self,node=None):
-        # If no node is specified, consider possibilities among all nodes
-        if node is None:
-            # If there are not already potential nodes in G
-            if self.G.nodes() - self.nodes == set():
-                # Populate the adjacent possible
-                sources = set(self.nodes)
-                for source in sources:
-                    targets = set(self.nodes) - set([source])
-                    for target1, target2 in itertools.combinations(targets, 2):
-                        pos = self.G.number_of_nodes()
-                        self.G.add_edge(source,pos)
-                        self.G.add_edge(pos,target1)
-                        self.G.add_edge(pos,target2)
-        # Otherwise, only consider possibilities involving the specified node
-        else:
-            # Protest if the node is outside the network
-            assert node in self.G
-            assert node in self.nodes
-            # Get the alters of the node
-            alters = set(self.nodes) - set([node])
-            for alter1, alter2 in itertools.combinations(alters, 2):
-                # Add downstream positions
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(node,pos)
-                self.G.add_edge(pos,alter1)
-                self.G.add_edge(pos,alter2)
-                # Add upstream positions
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(pos,node)
-                self.G.add_edge(pos,alter2)
-        return None
+    motif = MOTIFS["i1o2"]
 
 class InTwoOutOne(InOneOutOne):
 
-    name = "i1o2"
+    name = "i2o1"
     specs = {"update":"in-two-out-one"}
-
-    def update(self,node=None):
-        # If no node is specified, consider possibilities among all nodes
-        if node is None:
-            # If there are not already potential nodes in G
-            if self.G.nodes() - self.nodes == set():
-                # Populate the adjacent possible
-                targets = set(self.nodes)
-                for target in targets:
-                    sources = set(self.nodes) - set([target])
-                    for source1, source2 in itertools.combinations(sources, 2):
-                        pos = self.G.number_of_nodes()
-                        self.G.add_edge(source1,pos)
-                        self.G.add_edge(source2,pos)
-                        self.G.add_edge(pos,target)
-        # Otherwise, only consider possibilities involving the specified node
-        else:
-            # Protest if the node is outside the network
-            assert node in self.G
-            assert node in self.nodes
-            # Get the alters of the node
-            alters = set(self.nodes) - set([node])
-            for alter1, alter2 in itertools.combinations(alters, 2):
-                # Add downstream positions
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(node,pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(pos,alter2)
-                # Add upstream positions
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(alter2,pos)
-                self.G.add_edge(pos,node)
-        return None
+    motif = MOTIFS["i2o1"]
     
 class InOutThree(InOneOutOne):
 
     name = "io3"
     specs = {"update":"in-out-three"}
-
-    def update(self,node=None):
-        # If no node is specified, consider possibilities among all nodes
-        if node is None:
-            # If there are not already potential nodes in G
-            if self.G.nodes() - self.nodes == set():
-                # Populate the adjacent possible
-                targets = set(self.nodes)
-                for target in targets:
-                    sources = set(self.nodes) - set([target])
-                    for source1, source2 in itertools.combinations(sources, 2):
-                        # First InTwoOutOne
-                        pos = self.G.number_of_nodes()
-                        self.G.add_edge(source1,pos)
-                        self.G.add_edge(source2,pos)
-                        self.G.add_edge(pos,target)
-                        # Then InOneOutTwo
-                        pos = self.G.number_of_nodes()
-                        self.G.add_edge(target,pos)
-                        self.G.add_edge(pos,source1)
-                        self.G.add_edge(pos,source2)
-        # Otherwise, only consider possibilities involving the specified node
-        else:
-            # Protest if the node is outside the network
-            assert node in self.G
-            assert node in self.nodes
-            # Get the alters of the node
-            alters = set(self.nodes) - set([node])
-            for alter1, alter2 in itertools.combinations(alters, 2):
-                # Add downstream position
-                # First InTwoOutOne
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(node,pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(pos,alter2)
-                # Then InOneOutTwo
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(node,pos)
-                self.G.add_edge(pos,alter1)
-                self.G.add_edge(pos,alter2)
-                # Add upstream positions
-                # First InTwoOutOne
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(alter2,pos)
-                self.G.add_edge(pos,node)
-                # Then InOneOutTwo
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(pos,node)
-                self.G.add_edge(pos,alter2)
-        return None
+    motif = MOTIFS["io3"]
 
 class InTwoOutTwo(InOneOutOne):
 
     name = "i2o2"
     specs = {"update":"in-two-out-two"}
-
-    def update(self,node=None):
-        # If no node is specified, consider possibilities among all nodes
-        if node is None:
-            # If there are not already potential nodes in G
-            if self.G.nodes() - self.nodes == set():
-                # Populate the adjacent possible
-                targets = set(self.nodes)
-                for target1, target2 in itertools.combinations(targets, 2):
-                    sources = set(self.nodes) - set([target1,target2])
-                    for source1, source2 in itertools.combinations(sources, 2):
-                        pos = self.G.number_of_nodes()
-                        self.G.add_edge(target1,pos)
-                        self.G.add_edge(target2,pos)
-                        self.G.add_edge(pos,source1)
-                        self.G.add_edge(pos,source2)
-        # Otherwise, only consider possibilities involving the specified node
-        else:
-            # Protest if the node is outside the network
-            assert node in self.G
-            assert node in self.nodes
-            # Get the alters of the node
-            alters = set(self.nodes) - set([node])
-            for alter1, alter2, alter3 in itertools.combinations(alters, 3):
-                # Add three downstream positions
-                # with alter1
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(node,pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(pos,alter2)
-                self.G.add_edge(pos,alter3)
-                # with alter2
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(node,pos)
-                self.G.add_edge(alter2,pos)
-                self.G.add_edge(pos,alter1)
-                self.G.add_edge(pos,alter3)
-                # with alter3
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(node,pos)
-                self.G.add_edge(alter3,pos)
-                self.G.add_edge(pos,alter1)
-                self.G.add_edge(pos,alter2)
-                # Add three upstream positions
-                # with alter1
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(alter2,pos)
-                self.G.add_edge(alter3,pos)
-                self.G.add_edge(pos,alter1)
-                self.G.add_edge(pos,node)
-                # with alter2
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(alter3,pos)
-                self.G.add_edge(pos,alter2)
-                self.G.add_edge(pos,node)
-                # with alter3
-                pos = self.G.number_of_nodes()
-                self.G.add_node(pos)
-                self.G.add_edge(alter1,pos)
-                self.G.add_edge(alter2,pos)
-                self.G.add_edge(pos,alter3)
-                self.G.add_edge(pos,node)
-        return None
\ No newline at end of file
+    motif = MOTIFS["i2o2"]
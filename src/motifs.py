@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import itertools
+import numpy as np
+
+from src.utils import combinations
+
+class Motif():
+    """
+    Declarative specification of the ego network of an incoming node: the
+    sources it links from and the targets it links to. The positions that
+    involve an existing node, as the newest node of the position, are given
+    as variants: one (sources, targets) layout of the node and its alters
+    for every alter combination. In a layout, "n" stands for the node and
+    a digit d for its d-th alter, in ascending order. The positions among
+    the initial nodes are given by seed layouts. Each one pairs an outer
+    combination of the initial nodes with an inner combination of the
+    others, and "o" and "i" stand for their nodes.
+
+    Parameters
+    ----------
+    name (str): the short name of the model.
+    update (str): the name of the update rule.
+    variants (list): the (sources, targets) layouts of the positions
+                     involving a node, e.g. ("n", "0") for a node linking
+                     to its alter.
+    seeds (tuple): (outer, inner, layouts), the sizes of the outer and inner
+                   combinations and the (sources, targets) layouts of the
+                   initial positions, e.g. (1, 1, [("o", "i")]).
+
+    """
+
+    def __init__(self, name, update, variants, seeds):
+        self.name = name
+        self.update = update
+        self.variants = [tuple(layout) for layout in variants]
+        self.seeds = seeds
+        self.alters = len({c for layout in self.variants for side in layout for c in side if c != "n"})
+        return None
+
+    @classmethod
+    def complete(cls, name, update, i, o):
+        """
+        The motif of every position with i sources and o targets, each
+        taken once, in which the node takes every place among its alters.
+
+        Parameters
+        ----------
+        name (str): the short name of the model.
+        update (str): the name of the update rule.
+        i (int): the number of sources.
+        o (int): the number of targets.
+
+        Returns
+        -------
+        motif (Motif): the motif.
+
+        """
+        symbols = "n" + "".join(str(d) for d in range(i + o - 1))
+        variants = []
+        for sources in itertools.combinations(symbols, i):
+            variants.append(("".join(sources), "".join(c for c in symbols if c not in sources)))
+        return cls(name, update, variants, (i, o, [("o", "i")]))
+
+    def positions(self, node, alters):
+        """
+        Positions involving the node, for each combination of its alters.
+
+        Parameters
+        ----------
+        node (int): the node.
+        alters (np.ndarray): (C, alters) combinations of older nodes.
+
+        Returns
+        -------
+        positions (list): (sources, targets) index arrays of each variant.
+
+        """
+        columns = {"n": np.full(len(alters), node, dtype=np.intp)}
+        columns.update({str(d): alters[:, d] for d in range(alters.shape[1])})
+        return [tuple(np.column_stack([columns[c] for c in side]).reshape(len(alters), len(side)) for side in layout)
+                for layout in self.variants]
+
+    def initial(self, nodes):
+        """
+        Positions among the initial nodes, in the order of the seed layouts
+        for each pair of outer and inner combinations.
+
+        Parameters
+        ----------
+        nodes (list): the initial nodes.
+
+        Returns
+        -------
+        sources (list): the sources of each position.
+        targets (list): the targets of each position.
+
+        """
+        outer, inner, layouts = self.seeds
+        nodes = np.array(sorted(nodes), dtype=np.intp)
+        positions = []
+        for O in nodes[combinations(len(nodes), outer)]:
+            rest = np.setdiff1d(nodes, O)
+            for I in rest[combinations(len(rest), inner)]:
+                columns = {"o": O, "i": I}
+                for layout in layouts:
+                    positions.append(tuple(np.concatenate([columns[c] for c in side]).tolist() for side in layout))
+        return tuple(zip(*positions)) if positions else ((), ())
+
+# The motifs of the models of the paper
+MOTIFS = {"i1o1":Motif("i1o1", "in-one-out-one", [("n", "0"), ("0", "n")], (1, 1, [("o", "i")])),
+          "i1o2":Motif("i1o2", "in-one-out-two", [("n", "01"), ("0", "n1")], (1, 2, [("o", "i")])),
+          "i2o1":Motif("i2o1", "in-two-out-one", [("n0", "1"), ("01", "n")], (1, 2, [("i", "o")])),
+          "io3":Motif("io3", "in-out-three", [("n0", "1"), ("n", "01"), ("01", "n"), ("0", "n1")], (1, 2, [("i", "o"), ("o", "i")])),
+          "i2o2":Motif("i2o2", "in-two-out-two", [("n0", "12"), ("n1", "02"), ("n2", "01"), ("12", "0n"), ("02", "1n"), ("01", "2n")], (2, 2, [("o", "i")]))}
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+import scipy.sparse as sp
+import networkx as nx
+
+from src.pagerank import stochastic
+
+class Network():
+    """
+    A growing directed network with dense integer node IDs, stored as
+    growable arrays of edge sources and targets in the order they were
+    added. Joining a node is amortized O(1) per edge, and sparse matrix
+    views are built on demand and cached until the network changes.
+
+    Parameters
+    ----------
+    edges (iterable): initial (source, target) edges.
+
+    """
+
+    def __init__(self, edges=()):
+        self.n = 0
+        self.m = 0
+        self.sources = np.empty(16, dtype=np.intp)
+        self.targets = np.empty(16, dtype=np.intp)
+        self.cache = {}
+        for source, target in edges:
+            self.add_edge(source, target)
+        return None
+
+    @classmethod
+    def from_networkx(cls, G):
+        # Relabel the nodes densely in sorted order
+        index = {node: i for i, node in enumerate(sorted(G.nodes()))}
+        H = cls([(index[source], index[target]) for source, target in G.edges()])
+        H.add_nodes(len(index))
+        return H
+
+    def add_nodes(self, n):
+        # Make sure the network has at least n nodes
+        if n > self.n:
+            self.n = n
+            self.cache = {}
+        return None
+
+    def add_edge(self, source, target):
+        # Grow the edge arrays by doubling when they are full
+        if self.m == len(self.sources):
+            self.sources = np.resize(self.sources, max(2 * self.m, 16))
+            self.targets = np.resize(self.targets, max(2 * self.m, 16))
+        self.sources[self.m] = source
+        self.targets[self.m] = target
+        self.m += 1
+        self.n = max(self.n, source + 1, target + 1)
+        self.cache = {}
+        return None
+
+    def join(self, sources, targets):
+        # Add a new node with edges from the sources and to the targets
+        node = self.n
+        self.add_nodes(node + 1)
+        for source in sources:
+            self.add_edge(source, node)
+        for target in targets:
+            self.add_edge(node, target)
+        return node
+
+    def number_of_nodes(self):
+        return self.n
+
+    def number_of_edges(self):
+        return self.m
+
+    def nodes(self):
+        return range(self.n)
+
+    def edges(self):
+        return zip(self.sources[:self.m].tolist(), self.targets[:self.m].tolist())
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(range(self.n))
+
+    def __contains__(self, node):
+        return 0 <= node < self.n
+
+    def out_degree(self):
+        return np.bincount(self.sources[:self.m], minlength=self.n)
+
+    def in_degree(self):
+        return np.bincount(self.targets[:self.m], minlength=self.n)
+
+    def csr(self):
+        # Adjacency matrix with rows for sources and columns for targets
+        if "csr" not in self.cache:
+            data = np.ones(self.m)
+            self.cache["csr"] = sp.csr_matrix((data, (self.sources[:self.m], self.targets[:self.m])), shape=(self.n, self.n))
+        return self.cache["csr"]
+
+    def csc(self):
+        if "csc" not in self.cache:
+            self.cache["csc"] = self.csr().tocsc()
+        return self.cache["csc"]
+
+    def twins(self):
+        # Label each node by its class of structural twins, the nodes with the same in- and out-neighbours
+        csr, csc = self.csr(), self.csc()
+        classes = {}
+        labels = np.empty(self.n, dtype=np.intp)
+        for node in range(self.n):
+            key = (np.sort(csc.indices[csc.indptr[node]:csc.indptr[node+1]]).tobytes(),
+                   np.sort(csr.indices[csr.indptr[node]:csr.indptr[node+1]]).tobytes())
+            labels[node] = classes.setdefault(key, len(classes))
+        return labels
+
+    def transition(self):
+        # Row-stochastic transition matrix, with empty rows for dangling nodes
+        if "transition" not in self.cache:
+            self.cache["transition"] = stochastic(self.csr())
+        return self.cache["transition"]
+
+    def __getstate__(self):
+        # Leave out the cached views and the spare capacity
+        state = self.__dict__.copy()
+        state["sources"] = self.sources[:self.m].copy()
+        state["targets"] = self.targets[:self.m].copy()
+        state["cache"] = {}
+        return state
+
+    def copy(self):
+        H = Network()
+        H.n, H.m = self.n, self.m
+        H.sources, H.targets = self.sources.copy(), self.targets.copy()
+        return H
+
+    def head(self, n):
+        # The network as it was with its first n nodes: nodes only ever join,
+        # with edges to older nodes, so its edges are a prefix of the edges
+        m = int(np.count_nonzero((self.sources[:self.m] < n) & (self.targets[:self.m] < n)))
+        H = Network()
+        H.n, H.m = min(n, self.n), m
+        H.sources, H.targets = self.sources[:max(m, 16)].copy(), self.targets[:max(m, 16)].copy()
+        return H
+
+    def to_networkx(self, n=None):
+        # Export the subgraph induced by the first n nodes, defaults to all
+        n = self.n if n is None else n
+        keep = (self.sources[:self.m] < n) & (self.targets[:self.m] < n)
+        G = nx.DiGraph()
+        G.add_nodes_from(range(n))
+        G.add_edges_from(zip(self.sources[:self.m][keep].tolist(), self.targets[:self.m][keep].tolist()))
+        return G
+
+    def subgraph(self, nodes):
+        return self.to_networkx().subgraph(nodes)
+
+class Snapshots():
+    """
+    The snapshots of a growing network, one for each step. Nodes and edges
+    are only ever added, so the snapshot with n nodes is the subgraph of
+    the network induced by its first n nodes. Only the scores of each
+    snapshot are stored, and each snapshot is built as a networkx graph,
+    with the scores as the 'score' node attribute, when it is accessed.
+
+    Parameters
+    ----------
+    network (Network): the growing network.
+
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self.scores = []
+        return None
+
+    def append(self, scores):
+        # Store the scores of the snapshot with as many nodes as scores
+        if isinstance(scores, dict):
+            scores = [scores[node] for node in range(len(scores))]
+        self.scores.append(np.asarray(scores, dtype=float))
+        return None
+
+    def extend(self, scores):
+        for x in scores:
+            self.append(x)
+        return None
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        x = self.scores[i]
+        G = self.network.to_networkx(len(x))
+        nx.set_node_attributes(G, dict(enumerate(x.tolist())), 'score')
+        return G
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __delitem__(self, i):
+        del self.scores[i]
+
+    def sizes(self):
+        # Number of nodes in each snapshot
+        return np.array([len(x) for x in self.scores])
+
+    def matrix(self):
+        # Scores of every node in every snapshot, NaN before the node joins
+        X = np.full((len(self), self.network.number_of_nodes()), np.nan)
+        for i, x in enumerate(self.scores):
+            X[i, :len(x)] = x
+        return X
@@ -0,0 +1,656 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import networkx as nx
+
+def transition_matrix(G, nodes=None):
+    """
+    Row-stochastic transition matrix of a directed graph. The rows of
+    dangling nodes are left empty, as their mass is redistributed
+    uniformly by PageRank.
+
+    Parameters
+    ----------
+    G (nx.DiGraph): the graph to get the transition matrix for.
+    nodes (list): the node order for the rows and columns, defaults to
+                  the sorted nodes of G.
+
+    Returns
+    -------
+    W (sp.csr_matrix): the transition matrix.
+    nodes (list): the node order for the rows and columns.
+
+    """
+    nodes = sorted(G.nodes()) if nodes is None else list(nodes)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, dtype=float)
+    W = stochastic(A)
+    return W, nodes
+
+def stochastic(A):
+    """
+    Normalize the rows of an adjacency matrix to sum to one, leaving the
+    rows of dangling nodes empty.
+
+    Parameters
+    ----------
+    A (sp.spmatrix): the adjacency matrix, with rows for sources.
+
+    Returns
+    -------
+    W (sp.csr_matrix): the transition matrix.
+
+    """
+    A = sp.csr_matrix(A)
+    k = np.asarray(A.sum(axis=1)).ravel()
+    with np.errstate(divide="ignore"):
+        k = np.where(k > 0, 1.0 / k, 0.0)
+    W = sp.csr_matrix(sp.diags(k) @ A)
+    return W
+
+def pagerank_factor(W, alpha):
+    """
+    Factorize the base network once, so that the PageRank of any network
+    that adds a single node to it can be found with a low-rank update.
+
+    With y = (I - alpha W^T)^-1 1, the PageRank of the network is y/sum(y),
+    which matches nx.pagerank with uniform teleportation and uniform
+    redistribution of the mass on dangling nodes.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    alpha (float): the damping factor.
+
+    Returns
+    -------
+    M (np.ndarray): the dense inverse (I - alpha W^T)^-1.
+    y (np.ndarray): the unnormalized PageRank of the base network, M 1.
+
+    """
+    n = W.shape[0]
+    M = np.linalg.inv(np.eye(n) - alpha * W.T.toarray())
+    y = M.sum(axis=1)
+    return M, y
+
+def series(A, alpha, ord=1, tol=1.0e-10, max_iter=100000):
+    """
+    Solve (I - alpha A) x = 1 by its Neumann series, the sum of the terms
+    (alpha A)^k 1, for a matrix A whose norm of the given order is at most
+    one, such as a transition matrix W (ord=np.inf) or its transpose
+    (ord=1). Each term costs one sparse product.
+
+    Parameters
+    ----------
+    A (sp.spmatrix): the matrix.
+    alpha (float): the damping factor.
+    ord (float): the order of the norm in which A does not grow vectors.
+    tol (float): the largest error of an entry of the solution.
+    max_iter (int): the maximum number of terms.
+
+    Returns
+    -------
+    x (np.ndarray): the solution.
+
+    """
+    x = term = np.ones(A.shape[0])
+    for iteration in range(max_iter):
+        term = alpha * (A @ term)
+        x = x + term
+        # The rest of the series is at most alpha/(1-alpha) times the last term
+        if np.linalg.norm(term, ord) * alpha / (1 - alpha) < tol:
+            return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+class SparseFactor():
+    """
+    An estimate of the factor M = (I - alpha W^T)^-1 of the base network,
+    held as a sparse matrix, which pagerank_lowrank reads in place of the
+    dense inverse. Scoring a position only looks up the entries among its
+    sources and targets, and the column sums of M, which are kept whole.
+
+    Parameters
+    ----------
+    M (sp.csr_array): the estimated entries of M.
+    c (np.ndarray): the column sums of M, (I - alpha W)^-1 1.
+
+    """
+
+    def __init__(self, M, c):
+        self.M = sp.csr_array(M)
+        self.c = c
+        return None
+
+    def __getitem__(self, index):
+        # Entries at broadcast arrays of rows and columns, as for a dense M
+        rows, cols = np.broadcast_arrays(*index)
+        if rows.size == 0:
+            return np.zeros(rows.shape)
+        return np.asarray(self.M[rows.ravel(), cols.ravel()]).reshape(rows.shape)
+
+    def sum(self, axis=0):
+        # Only the column sums are kept
+        if axis != 0:
+            raise ValueError("Only the column sums of the factor are kept")
+        return self.c
+
+class PushFactor(SparseFactor):
+    """
+    The factor M = (I - alpha W^T)^-1 of the base network estimated by
+    backward local push, in the style of Andersen, Chung and Lang, one row
+    at a time as the positions that pagerank_lowrank scores need them.
+
+    Row s of M holds the discounted visits to s of walks from every node,
+    x = e_s + alpha W x. Push from s keeps an estimate p and a residual r
+    with x = p + (I - alpha W)^-1 r, starting from the unit residual on s,
+    and pushes the residual of a node to its in-neighbours until every
+    residual is at most epsilon. Only the neighbourhood of s where the
+    residual exceeds epsilon is touched, and each entry of the estimate is
+    at most epsilon/(1-alpha) below M. The rows are kept sparse.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    alpha (float): the damping factor.
+    epsilon (float): the largest residual left unpushed.
+
+    """
+
+    def __init__(self, W, alpha, epsilon=1.0e-4):
+        n = W.shape[0]
+        self.W = sp.csr_array(W)
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.pushed = np.zeros(n, dtype=bool)
+        self.residual = 0.0
+        super().__init__(sp.csr_array((n, n)), series(self.W, alpha, np.inf))
+        return None
+
+    def push(self, nodes):
+        # Push the rows of the nodes that have not been pushed yet, all at once
+        S = np.unique(nodes)
+        S = S[~self.pushed[S]]
+        if len(S) == 0:
+            return None
+        k, n = len(S), self.W.shape[0]
+        R = sp.csr_array((np.ones(k), (np.arange(k), S)), shape=(k, n))
+        WT = self.W.T.tocsr()
+        rows, cols, values = [], [], []
+        while True:
+            # Push every residual above epsilon to the in-neighbours of its node
+            push = R.data > self.epsilon
+            if not push.any():
+                break
+            F = sp.csr_array((np.where(push, R.data, 0.0), R.indices.copy(), R.indptr.copy()), shape=(k, n))
+            F.eliminate_zeros()
+            F = F.tocoo()
+            rows.append(F.row)
+            cols.append(F.col)
+            values.append(F.data)
+            R.data[push] = 0.0
+            R = sp.csr_array(R + self.alpha * (F.tocsr() @ WT))
+        self.residual = max(self.residual, float(R.data.max()) if R.nnz > 0 else 0.0)
+        # Put the pushed rows in place, summing the pushes of each entry
+        rows, cols, values = (np.concatenate(arrays) for arrays in (rows, cols, values))
+        self.M = sp.csr_array(self.M + sp.csr_array((values, (S[rows], cols)), shape=(n, n)))
+        self.pushed[S] = True
+        return None
+
+    def __getitem__(self, index):
+        rows, cols = np.broadcast_arrays(*index)
+        self.push(rows.ravel())
+        return super().__getitem__(index)
+
+    def bound(self):
+        # The largest error of an entry of the rows pushed so far
+        return self.residual / (1 - self.alpha)
+
+def pagerank_push(W, alpha, epsilon=1.0e-4):
+    """
+    Prepare the factor of the base network for scoring with
+    pagerank_lowrank by local push. Nothing is pushed until a position is
+    scored, and then only the rows of its sources.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    alpha (float): the damping factor.
+    epsilon (float): the largest residual left unpushed.
+
+    Returns
+    -------
+    M (PushFactor): the estimate of (I - alpha W^T)^-1, pushed on demand.
+    y (np.ndarray): the unnormalized PageRank of the base network, M 1,
+                    from its series.
+
+    """
+    return PushFactor(W, alpha, epsilon), series(W.T.tocsr(), alpha, 1)
+
+def pagerank_montecarlo(W, alpha, walks=10000, generator=None):
+    """
+    Estimate the factor of the base network from a fixed budget of random
+    walks, for scoring with pagerank_lowrank.
+
+    A walk from v that goes on to a random out-neighbour with probability
+    alpha, and stops otherwise or at a dangling node, visits u on average
+    M[u, v] times, with M = (I - alpha W^T)^-1. The budget is spread evenly
+    over the nodes, with the walks left over starting from nodes drawn
+    uniformly, so the mean visits to u of the walks from v estimate M[u, v],
+    and their spread gives the standard error of the estimate. A node that
+    starts no walk, when there are fewer walks than nodes, is only known to
+    visit itself. All walks take their steps together,
+    so the cost is one vectorized pass per step over the walks still
+    going, and the visits are counted sparsely, per pair of visited and
+    starting node, so the cost and memory grow with the budget rather than
+    with the size of the network. The row sums of M come from their series.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network, with equal
+                       weights on the out-edges of each node.
+    alpha (float): the damping factor.
+    walks (int): the total number of walks.
+    generator (np.random.Generator): the random number generator.
+
+    Returns
+    -------
+    M (SparseFactor): the estimate of (I - alpha W^T)^-1.
+    y (np.ndarray): the unnormalized PageRank of the base network, M 1,
+                    from its series.
+    error (float): the largest standard error of an estimated entry of M.
+
+    """
+    generator = np.random.default_rng() if generator is None else generator
+    n = W.shape[0]
+    W = sp.csr_matrix(W)
+    degree = np.diff(W.indptr)
+    start = np.concatenate([np.repeat(np.arange(n), walks // n), generator.choice(n, walks % n, replace=False)])
+    started = np.bincount(start, minlength=n)
+    walk, node = np.arange(walks), start.copy()
+    visits = []
+    while node.size > 0:
+        visits.append(walk * n + node)
+        # Go on from the nodes that are not dangling with probability alpha
+        going = (generator.random(node.size) < alpha) & (degree[node] > 0)
+        walk, node = walk[going], node[going]
+        node = W.indices[W.indptr[node] + (generator.random(node.size) * degree[node]).astype(np.intp)]
+    # Count the visits of each walk to each node, then sum the counts and their squares per visited and starting node
+    key, count = np.unique(np.concatenate(visits + [np.empty(0, dtype=np.intp)]), return_counts=True)
+    walk, node = np.divmod(key, n)
+    pair, inverse = np.unique(node * n + start[walk], return_inverse=True)
+    total = np.bincount(inverse.ravel(), weights=count, minlength=len(pair))
+    square = np.bincount(inverse.ravel(), weights=count.astype(float) ** 2, minlength=len(pair))
+    row, col = np.divmod(pair, n)
+    mean = total / started[col]
+    error = np.sqrt(np.maximum(square / started[col] - mean ** 2, 0.0) / started[col])
+    alone = np.flatnonzero(started == 0)
+    M = sp.csr_array((np.concatenate([mean, np.ones(len(alone))]), (np.concatenate([row, alone]), np.concatenate([col, alone]))), shape=(n, n))
+    # The column sums of the estimate keep the update consistent with its entries
+    y = series(W.T.tocsr(), alpha, 1)
+    return SparseFactor(M, np.asarray(M.sum(axis=0)).ravel()), y, float(error.max(initial=0.0))
+
+def pagerank_lowrank(W, sources, targets, alpha, factor=None, full=False):
+    """
+    PageRank of a new node in each of a batch of augmented networks, where
+    every augmented network adds one node to the base network with edges
+    from the given sources and to the given targets.
+
+    Adding the node changes the out-degree of its sources and adds one row
+    and column, which is a rank |sources|+1 update of the base system. The
+    Woodbury identity reduces each candidate to a |sources| x |sources|
+    linear system on top of the factorized base network.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    sources (np.ndarray): (B, i) indices of the in-neighbours of each new node.
+    targets (np.ndarray): (B, o) indices of the out-neighbours of each new node.
+    alpha (float): the damping factor.
+    factor (tuple): the output of pagerank_factor(W, alpha), if already known.
+    full (bool): whether to return the PageRank of every node, rather than
+                 only of the new node, which takes O(B n) memory.
+
+    Returns
+    -------
+    scores (np.ndarray): (B,) PageRank of the new node in each network, or
+                         (B, n+1) PageRank of every node if full.
+
+    """
+    M, y = pagerank_factor(W, alpha) if factor is None else factor
+    sources = np.asarray(sources, dtype=np.intp)
+    targets = np.asarray(targets, dtype=np.intp)
+    B, i = sources.shape
+    # Out-degrees of the sources once they link to the new node
+    k = np.diff(W.indptr)[sources] + 1
+    # Flow that the new node sends back to its sources through its targets
+    g = M[sources[:, :, None], targets[:, None, :]].mean(axis=2)
+    # Flow between the sources that the new node diverts
+    D = M[sources[:, :, None], sources[:, None, :]] - np.eye(i)
+    # Solve for the flow z_s = y'_s / (k_s + 1) from each source into the new node
+    L = k[:, :, None] * np.eye(i) - alpha**2 * g[:, :, None] + D
+    z = np.linalg.solve(L, (y[sources] + alpha * g)[:, :, None])[:, :, 0]
+    y_new = 1 + alpha * z.sum(axis=1)
+    # Normalize by the total unnormalized PageRank of the augmented network
+    c = M.sum(axis=0)
+    total = y.sum() + alpha * y_new * c[targets].mean(axis=1) - (z * (c[sources] - 1)).sum(axis=1) + y_new
+    if not full:
+        return y_new / total
+    # The existing nodes lose the flow the sources divert and gain the flow of the new node
+    Y = y[None, :] - np.einsum('nbi,bi->bn', M[:, sources], z) + alpha * y_new[:, None] * M[:, targets].mean(axis=2).T
+    np.add.at(Y, (np.arange(B)[:, None], sources), z)
+    return np.hstack([Y, y_new[:, None]]) / total[:, None]
+
+def pagerank_networkx(G, sources, targets, alpha, max_iter=1000):
+    """
+    PageRank of a new node in each of a batch of augmented networks, found
+    by running nx.pagerank on each of them in turn. The new node is added
+    to G and removed again after each network.
+
+    Parameters
+    ----------
+    G (nx.DiGraph): the base network, with nodes 0 to n-1.
+    sources (np.ndarray): (B, i) in-neighbours of each new node.
+    targets (np.ndarray): (B, o) out-neighbours of each new node.
+    alpha (float): the damping factor.
+    max_iter (int): the maximum number of power iterations.
+
+    Returns
+    -------
+    scores (np.ndarray): (B,) PageRank of the new node in each network.
+
+    """
+    node = G.number_of_nodes()
+    scores = np.empty(len(sources))
+    for b, (S, T) in enumerate(zip(np.asarray(sources).tolist(), np.asarray(targets).tolist())):
+        G.add_edges_from([(source, node) for source in S] + [(node, target) for target in T])
+        scores[b] = nx.pagerank(G, alpha=alpha, max_iter=max_iter)[node]
+        G.remove_node(node)
+    return scores
+
+def pagerank(W, alpha, x0=None, tol=1.0e-6, max_iter=1000):
+    """
+    PageRank of a network by power iteration, as in nx.pagerank.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the network.
+    alpha (float): the damping factor.
+    x0 (np.ndarray): the starting vector, defaults to uniform.
+    tol (float): the error tolerance of nx.pagerank.
+    max_iter (int): the maximum number of power iterations.
+
+    Returns
+    -------
+    x (np.ndarray): PageRank of each node.
+    iterations (int): the number of power iterations run.
+
+    """
+    N = W.shape[0]
+    x = np.repeat(1.0 / N, N) if x0 is None else np.asarray(x0, dtype=float) / np.sum(x0)
+    A = W.T.tocsr()
+    dangling = np.diff(W.indptr) == 0
+    for iterations in range(1, max_iter + 1):
+        xlast = x
+        x = alpha * (A @ xlast + xlast[dangling].sum() / N) + (1 - alpha) / N
+        # Check convergence, l1 norm
+        if np.absolute(x - xlast).sum() < N * tol:
+            return x, iterations
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+def augmented_matrix(W, sources, targets):
+    """
+    Stack a batch of augmented networks into one block-diagonal system.
+    Block b holds the base network plus a new node, with index n, that has
+    edges from sources[b] and to targets[b].
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    sources (np.ndarray): (B, i) indices of the in-neighbours of each new node.
+    targets (np.ndarray): (B, o) indices of the out-neighbours of each new node.
+
+    Returns
+    -------
+    A (sp.csr_matrix): (B(n+1), B(n+1)) transposed transition matrix of the
+                       stacked networks, so that A x propagates x by one step.
+    dangling (np.ndarray): (B, n+1) mask of the dangling nodes in each block.
+
+    """
+    n = W.shape[0]
+    N = n + 1
+    B, i = sources.shape
+    o = targets.shape[1]
+    W = W.tocoo()
+    k = np.diff(W.tocsr().indptr)
+    offsets = np.arange(B)[:, None] * N
+    # Sources spread their out-flow over one more edge
+    factor = np.ones((B, n))
+    np.put_along_axis(factor, sources, k[sources] / (k[sources] + 1), axis=1)
+    data = [(W.data[None, :] * factor[:, W.row]).ravel(),
+            np.broadcast_to(1 / (k[sources] + 1), (B, i)).ravel(),
+            np.full(B * o, 1 / o)]
+    rows = [(W.row[None, :] + offsets).ravel(),
+            (sources + offsets).ravel(),
+            np.broadcast_to(n + offsets, (B, o)).ravel()]
+    cols = [(W.col[None, :] + offsets).ravel(),
+            np.broadcast_to(n + offsets, (B, i)).ravel(),
+            (targets + offsets).ravel()]
+    A = sp.csr_matrix((np.concatenate(data), (np.concatenate(cols), np.concatenate(rows))), shape=(B * N, B * N))
+    # Sources are no longer dangling once they link to the new node
+    dangling = np.zeros((B, N), dtype=bool)
+    dangling[:, :n] = (k == 0)
+    np.put_along_axis(dangling, sources, False, axis=1)
+    return A, dangling
+
+def pagerank_batched(W, sources, targets, alpha, chunk_size=None, tol=1.0e-6, max_iter=1000):
+    """
+    PageRank of a new node in each of a batch of augmented networks, found
+    by power iteration on all of them at once. Each network follows the
+    same iterations, dangling-node handling and convergence test as
+    nx.pagerank, and stops updating as soon as it has converged.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    sources (np.ndarray): (B, i) indices of the in-neighbours of each new node.
+    targets (np.ndarray): (B, o) indices of the out-neighbours of each new node.
+    alpha (float): the damping factor.
+    chunk_size (int): the number of networks to stack at a time, which
+                      bounds memory to O(chunk_size * edges). Defaults to all.
+    tol (float): the error tolerance of nx.pagerank.
+    max_iter (int): the maximum number of power iterations.
+
+    Returns
+    -------
+    scores (np.ndarray): (B,) PageRank of the new node in each network.
+
+    """
+    sources = np.asarray(sources, dtype=np.intp)
+    targets = np.asarray(targets, dtype=np.intp)
+    B = sources.shape[0]
+    chunk_size = B if chunk_size is None else chunk_size
+    scores = np.empty(B)
+    for start in range(0, B, max(chunk_size, 1)):
+        chunk = slice(start, start + chunk_size)
+        X, _ = power_iteration(W, sources[chunk], targets[chunk], alpha, tol=tol, max_iter=max_iter)
+        scores[chunk] = X[:, -1]
+    return scores
+
+def power_iteration(W, sources, targets, alpha, x0=None, tol=1.0e-6, max_iter=1000, settled=None):
+    """
+    Power iteration on a stack of augmented networks, as in nx.pagerank.
+    Converged networks are frozen and dropped from the stacked system, so
+    unless settled is given each result does not depend on the other
+    networks in the batch.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    sources (np.ndarray): (B, i) indices of the in-neighbours of each new node.
+    targets (np.ndarray): (B, o) indices of the out-neighbours of each new node.
+    alpha (float): the damping factor.
+    x0 (np.ndarray): (B, n+1) starting vectors, defaults to uniform.
+    tol (float): the error tolerance of nx.pagerank.
+    max_iter (int): the maximum number of power iterations.
+    settled (function): called as settled(x, bound) with the current
+                        vectors of the networks still iterating and a bound
+                        on their l1 error, returns a mask of the networks
+                        that can stop before reaching the tolerance.
+
+    Returns
+    -------
+    X (np.ndarray): (B, n+1) PageRank of each augmented network.
+    iterations (np.ndarray): (B,) the number of power iterations run for
+                             each network.
+
+    """
+    B = sources.shape[0]
+    N = W.shape[0] + 1
+    X = np.full((B, N), 1.0 / N) if x0 is None else np.array(x0, dtype=float)
+    iterations = np.zeros(B, dtype=int)
+    # Networks still iterating, and the networks held in the stacked system
+    active = live = np.arange(B)
+    A, dangling = augmented_matrix(W, sources, targets)
+    x = X.copy()
+    for iteration in range(1, max_iter + 1):
+        xlast = x
+        x = alpha * ((A @ xlast.ravel()).reshape(xlast.shape) + (xlast * dangling).sum(axis=1, keepdims=True) / N) + (1 - alpha) / N
+        # Check convergence of each network, l1 norm
+        err = np.absolute(x - xlast).sum(axis=1)
+        running = np.isin(live, active)
+        done = running & (err < N * tol)
+        if settled is not None:
+            done[running] |= settled(x[running], alpha / (1 - alpha) * err[running])
+        X[live[done]] = x[done]
+        iterations[live[done]] = iteration
+        active = np.setdiff1d(active, live[done])
+        if active.size == 0:
+            return X, iterations
+        # Drop the converged networks once they make up half the system
+        if 2 * active.size <= live.size:
+            keep = np.isin(live, active)
+            live, x = live[keep], x[keep]
+            A, dangling = augmented_matrix(W, sources[live], targets[live])
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+def warm_start(W, sources, alpha, x):
+    """
+    Starting vectors for power iteration on a batch of augmented networks,
+    from the PageRank of the base network. The score of each new node is
+    interpolated from the flow of its sources, and the scores of the
+    existing nodes are scaled down to make room for it.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    sources (np.ndarray): (B, i) indices of the in-neighbours of each new node.
+    alpha (float): the damping factor.
+    x (np.ndarray): PageRank of the base network.
+
+    Returns
+    -------
+    x0 (np.ndarray): (B, n+1) starting vector of each augmented network.
+
+    """
+    N = W.shape[0] + 1
+    k = np.diff(W.indptr)
+    dangling = x[k == 0].sum()
+    entry = (1 - alpha + alpha * dangling) / N + alpha * (x[sources] / (k[sources] + 1)).sum(axis=1)
+    return np.hstack([np.outer(1 - entry, x), entry[:, None]])
+
+def pagerank_bounds(W, sources, targets, alpha, x0, iterations=10):
+    """
+    Bounds on the PageRank of a new node in each of a batch of augmented
+    networks, from a few power iterations. With err the l1 change of the
+    last iteration, the score is within alpha/(1-alpha) err of the result,
+    so the iterations can be resumed from the result to tighten the bounds.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    sources (np.ndarray): (B, i) indices of the in-neighbours of each new node.
+    targets (np.ndarray): (B, o) indices of the out-neighbours of each new node.
+    alpha (float): the damping factor.
+    x0 (np.ndarray): (B, n+1) starting vectors, such as from warm_start.
+    iterations (int): the number of power iterations.
+
+    Returns
+    -------
+    X (np.ndarray): (B, n+1) the vectors after the iterations.
+    lower (np.ndarray): (B,) lower bound on the PageRank of each new node.
+    upper (np.ndarray): (B,) upper bound on the PageRank of each new node.
+
+    """
+    sources = np.asarray(sources, dtype=np.intp)
+    targets = np.asarray(targets, dtype=np.intp)
+    N = W.shape[0] + 1
+    A, dangling = augmented_matrix(W, sources, targets)
+    X = xlast = np.asarray(x0, dtype=float)
+    for iteration in range(iterations):
+        xlast = X
+        X = alpha * ((A @ xlast.ravel()).reshape(xlast.shape) + (xlast * dangling).sum(axis=1, keepdims=True) / N) + (1 - alpha) / N
+    bound = alpha / (1 - alpha) * np.absolute(X - xlast).sum(axis=1)
+    return X, X[:, -1] - bound, X[:, -1] + bound
+
+def pagerank_warm(W, sources, targets, alpha, x, gamma=None, precision=1.0e-3, best=-np.inf, chunk_size=None, tol=1.0e-6, max_iter=1000):
+    """
+    PageRank of a new node in each of a batch of augmented networks, found
+    by power iteration started from the PageRank of the base network. Each
+    network stops as soon as its score is precise enough to select among
+    them, or once it reaches the tolerance of nx.pagerank.
+
+    With x the PageRank after an iteration and err the l1 change it made,
+    the error of x is at most alpha/(1-alpha) err. For selection with
+    probability proportional to score^gamma a network stops once gamma times
+    the relative error of its score is below the precision. For selection
+    of the maximum (gamma=np.inf) a network stops once its score cannot
+    reach the lowest possible score of the best network seen so far.
+
+    Parameters
+    ----------
+    W (sp.csr_matrix): transition matrix of the base network.
+    sources (np.ndarray): (B, i) indices of the in-neighbours of each new node.
+    targets (np.ndarray): (B, o) indices of the out-neighbours of each new node.
+    alpha (float): the damping factor.
+    x (np.ndarray): PageRank of the base network.
+    gamma (float): the exponent of the selection, np.inf to select the
+                   maximum, or None to run to the tolerance.
+    precision (float): the relative precision of the selection weights.
+    best (float): the lowest possible score of the best network in earlier
+                  batches, for selection of the maximum.
+    chunk_size (int): the number of networks to stack at a time, defaults
+                      to all.
+    tol (float): the error tolerance of nx.pagerank.
+    max_iter (int): the maximum number of power iterations.
+
+    Returns
+    -------
+    scores (np.ndarray): (B,) PageRank of the new node in each network.
+    iterations (np.ndarray): (B,) the number of power iterations run for
+                             each network.
+    best (float): the lowest possible score of the best network so far.
+
+    """
+    sources = np.asarray(sources, dtype=np.intp)
+    targets = np.asarray(targets, dtype=np.intp)
+    B = sources.shape[0]
+    # Stop each network once its score is settled for the selection
+    def settled(X, bound):
+        nonlocal best
+        if gamma is None:
+            return np.zeros(len(X), dtype=bool)
+        if np.isinf(gamma):
+            best = max(best, np.max(X[:, -1] - bound))
+            return X[:, -1] + bound < best
+        return gamma * bound <= precision * X[:, -1]
+    chunk_size = B if chunk_size is None else chunk_size
+    scores = np.empty(B)
+    iterations = np.empty(B, dtype=int)
+    for start in range(0, B, max(chunk_size, 1)):
+        chunk = slice(start, start + chunk_size)
+        x0 = warm_start(W, sources[chunk], alpha, x)
+        X, iterations[chunk] = power_iteration(W, sources[chunk], targets[chunk], alpha, x0=x0, tol=tol, max_iter=max_iter, settled=settled)
+        scores[chunk] = X[:, -1]
+    return scores, iterations, best
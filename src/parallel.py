@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+def score_groups(function, groups):
+    """
+    Score groups of positions in a worker process.
+
+    Parameters
+    ----------
+    function (callable): called as function(sources, targets) for each
+                         group, with the base network already bound to it.
+    groups (list): (sources, targets) index arrays of each group.
+
+    Returns
+    -------
+    scores (list): the scores of the positions in each group.
+
+    """
+    return [function(sources, targets) for sources, targets in groups]
+
+def split(groups, parts):
+    """
+    Split groups of positions into contiguous parts with about as many
+    positions each, keeping their order.
+
+    Parameters
+    ----------
+    groups (list): (sources, targets) index arrays of each group.
+    parts (int): the number of parts.
+
+    Returns
+    -------
+    parts (list): lists of groups, one for each part that is not empty.
+
+    """
+    sizes = np.cumsum([len(sources) for sources, targets in groups])
+    total = sizes[-1] if len(sizes) else 0
+    bounds = np.searchsorted(sizes, np.arange(1, parts) * total / parts, side="right")
+    bounds = [0] + bounds.tolist() + [len(groups)]
+    return [groups[start:end] for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Online reducers for the steps of a growing network
+
+Each reducer folds the steps yielded by iter_grow into a running summary,
+in O(n) time per step and without keeping the snapshots, so the metrics
+of the analysis notebooks can be computed on runs too long to store.
+A reducer is started on the model before the first step and updated with
+each step, a dictionary of the new `node`, the size `n`, the selected
+`position` as (sources, targets) and the `scores` of the new snapshot.
+
+Example:
+    ranks, entrants = RankTrajectory([10, 20]), EntrantRanks()
+    for step in model.iter_grow(1000, reducers=[ranks, entrants]):
+        pass
+    ranks.result()[10]
+"""
+
+import numpy as np
+import networkx as nx
+
+def relative_rank(scores, node):
+    """
+    Relative rank of a node by score, as in the notebooks: its position in
+    the nodes sorted by ascending score, ties broken by node ID, over n - 1.
+
+    Parameters
+    ----------
+    scores (np.ndarray): (n,) score of each node.
+    node (int): the node.
+
+    Returns
+    -------
+    rank (float): the rank, 0 for the lowest score and 1 for the highest.
+
+    """
+    score = scores[node]
+    below = np.count_nonzero(scores < score) + np.count_nonzero(scores[:node] == score)
+    return below / (len(scores) - 1)
+
+class Reducer():
+    """
+    A running summary of the steps of a growing network.
+
+    """
+
+    def start(self, model):
+        # Read what is needed of the network before the first step
+        return None
+
+    def update(self, step):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+class RankTrajectory(Reducer):
+    """
+    The relative rank and score of some nodes at every step after they
+    join, as in the rank dynamics of plots_ranks.ipynb.
+
+    Parameters
+    ----------
+    nodes (list): the nodes to track.
+
+    """
+
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        self.ranks = {node: [] for node in self.nodes}
+        self.scores = {node: [] for node in self.nodes}
+        return None
+
+    def update(self, step):
+        scores = step["scores"]
+        for node in self.nodes:
+            if node < len(scores):
+                self.ranks[node].append(relative_rank(scores, node))
+                self.scores[node].append(float(scores[node]))
+        return None
+
+    def result(self):
+        # The ranks of each node, one per step since it joined
+        return {node: np.array(ranks) for node, ranks in self.ranks.items()}
+
+class EntrantRanks(Reducer):
+    """
+    The relative rank of each new node in the snapshot it joins.
+
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.ranks = []
+        return None
+
+    def update(self, step):
+        self.nodes.append(step["node"])
+        self.ranks.append(relative_rank(step["scores"], step["node"]))
+        return None
+
+    def result(self):
+        return np.array(self.nodes), np.array(self.ranks)
+
+class AlterAges(Reducer):
+    """
+    The sources and targets that each new node selects. Nodes are numbered
+    in the order they join, so the age of an alter follows from its ID.
+
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.sources = []
+        self.targets = []
+        return None
+
+    def update(self, step):
+        sources, targets = step["position"]
+        self.nodes.append(step["node"])
+        self.sources.append(tuple(sources))
+        self.targets.append(tuple(targets))
+        return None
+
+    def result(self):
+        # Arrays of the new nodes and of the sources and targets of each
+        return np.array(self.nodes), np.array(self.sources), np.array(self.targets)
+
+class DegreeHistogram(Reducer):
+    """
+    The histograms of in- and out-degrees of the network, kept up to date
+    with each position in time proportional to its size.
+
+    """
+
+    def __init__(self):
+        self.degrees = {"in":[], "out":[]}
+        self.counts = {"in":[], "out":[]}
+        return None
+
+    def shift(self, direction, node, delta):
+        # Move the node to the bin of its new degree, adding the node if new
+        degrees, counts = self.degrees[direction], self.counts[direction]
+        if node == len(degrees):
+            degrees.append(0)
+            counts.extend([0] * (1 - len(counts)))
+            counts[0] += 1
+        counts[degrees[node]] -= 1
+        degrees[node] += delta
+        counts.extend([0] * (degrees[node] + 1 - len(counts)))
+        counts[degrees[node]] += 1
+        return None
+
+    def start(self, model):
+        G = model.G
+        if isinstance(G, nx.DiGraph):
+            degrees = {"in":[G.in_degree(v) for v in range(G.number_of_nodes())],
+                       "out":[G.out_degree(v) for v in range(G.number_of_nodes())]}
+        else:
+            degrees = {"in":G.in_degree().tolist(), "out":G.out_degree().tolist()}
+        for direction in ["in", "out"]:
+            self.degrees[direction], self.counts[direction] = [], []
+            for node, degree in enumerate(degrees[direction]):
+                self.shift(direction, node, degree)
+        return None
+
+    def update(self, step):
+        sources, targets = step["position"]
+        node = step["node"]
+        self.shift("in", node, len(sources))
+        self.shift("out", node, len(targets))
+        for source in sources:
+            self.shift("out", source, 1)
+        for target in targets:
+            self.shift("in", target, 1)
+        return None
+
+    def result(self):
+        # Number of nodes of each in-degree and of each out-degree
+        return np.array(self.counts["in"]), np.array(self.counts["out"])
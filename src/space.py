@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import math
+import numpy as np
+from collections.abc import Mapping
+
+from src.utils import combinations
+
+class AdjacentPossible():
+    """
+    The positions that an incoming node could take in the network, stored
+    implicitly. A position is a descriptor (sources, targets) of the nodes
+    that the incoming node would link from and to. Only the positions among
+    the initial nodes are stored; the positions involving each later node
+    are generated by the model on demand, from the nodes that are older.
+
+    Parameters
+    ----------
+    model (Endogenous): the model, which generates the positions involving
+                        a node as model.positions(node, alters) from an
+                        (C, model.alters) array of combinations of older
+                        nodes, holds the network model.G, and samples with
+                        its generator model.rng.
+
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.seeds = []
+        self.nodes = []
+        return None
+
+    def __setstate__(self, state):
+        # Runs pickled before the model was named as such kept it as motif
+        if "motif" in state:
+            state["model"] = state.pop("motif")
+        self.__dict__.update(state)
+        return None
+
+    def seed(self, sources, targets):
+        # Store the positions among the initial nodes, grouped by shape
+        shapes = {}
+        for S, T in zip(sources, targets):
+            shapes.setdefault((len(S), len(T)), []).append((S, T))
+        for group in shapes.values():
+            S, T = zip(*group)
+            self.seeds.append((np.array(S, dtype=np.intp), np.array(T, dtype=np.intp)))
+        return None
+
+    def add(self, node):
+        # Include the positions involving the node
+        self.nodes.append(node)
+        return None
+
+    def variants(self):
+        # Number of positions for each combination of alters
+        return len(self.model.positions(0, np.zeros((0, self.model.alters), dtype=np.intp)))
+
+    def sizes(self):
+        # Number of positions in each block of the adjacent possible
+        seeds = [len(S) for S, T in self.seeds]
+        variants = self.variants()
+        return seeds + [math.comb(node, self.model.alters) * variants for node in self.nodes]
+
+    def __len__(self):
+        return sum(self.sizes())
+
+    def blocks(self):
+        # Generate the positions block by block, as index arrays of one shape
+        for S, T in self.seeds:
+            yield S, T
+        for node in self.nodes:
+            alters = combinations(node, self.model.alters)
+            for S, T in self.model.positions(node, alters):
+                yield S, T
+
+    def groups(self, size=None, index=False):
+        # Merge the blocks of each shape into groups of at most size positions,
+        # with the index of each position in the adjacent possible if asked
+        buffers = {}
+        offset = 0
+        for S, T in self.blocks():
+            buffer = buffers.setdefault((S.shape[1], T.shape[1]), [])
+            buffer.append((S, T, np.arange(offset, offset + len(S))))
+            offset += len(S)
+            if size is not None and sum(len(S) for S, T, I in buffer) >= size:
+                S, T, I = (np.concatenate(arrays) for arrays in zip(*buffer))
+                full = len(S) - len(S) % size
+                for start in range(0, full, size):
+                    group = S[start:start+size], T[start:start+size], I[start:start+size]
+                    yield group if index else group[:2]
+                buffer[:] = [(S[full:], T[full:], I[full:])]
+        for buffer in buffers.values():
+            S, T, I = (np.concatenate(arrays) for arrays in zip(*buffer))
+            if len(S) > 0:
+                yield (S, T, I) if index else (S, T)
+
+    def __iter__(self):
+        for S, T in self.blocks():
+            yield from descriptors(S, T)
+
+    def to_networkx(self):
+        # The network with each position as a node of its own, labelled by its
+        # descriptor, with edges from its sources and to its targets
+        G = self.model.G.to_networkx()
+        for S, T in self:
+            G.add_edges_from([(source, (S, T)) for source in S] + [((S, T), target) for target in T])
+        return G
+
+    def sample(self):
+        # Select a block with probability proportional to its size
+        sizes = self.sizes()
+        block = self.model.rng.choices(range(len(sizes)), weights=sizes, k=1)[0]
+        if block < len(self.seeds):
+            S, T = self.seeds[block]
+            i = self.model.rng.randrange(len(S))
+            return next(descriptors(S[i:i+1], T[i:i+1]))
+        # Select a combination of alters and a variant uniformly
+        node = self.nodes[block - len(self.seeds)]
+        alters = np.array([sorted(self.model.rng.sample(range(node), self.model.alters))], dtype=np.intp)
+        S, T = self.model.rng.choice(self.model.positions(node, alters))
+        return next(descriptors(S, T))
+
+def descriptors(sources, targets):
+    """
+    Descriptors of the positions given as index arrays.
+
+    Parameters
+    ----------
+    sources (np.ndarray): (B, i) sources of each position.
+    targets (np.ndarray): (B, o) targets of each position.
+
+    Returns
+    -------
+    positions (iterator): (sources, targets) tuples for each position.
+
+    """
+    return zip(map(tuple, sources.tolist()), map(tuple, targets.tolist()))
+
+def equivalence(labels, sources, targets, automorphisms=()):
+    """
+    Classes of equivalent positions, which give the incoming node the same
+    score. Two positions are equivalent when an automorphism of the network
+    maps one onto the other. Structural twins can be swapped by an
+    automorphism, so positions are first keyed by the twin classes of their
+    sources and targets, and then by the smallest key over the given
+    automorphisms.
+
+    Parameters
+    ----------
+    labels (np.ndarray): (n,) twin class of each node, as from Network.twins().
+    sources (np.ndarray): (B, i) sources of each position.
+    targets (np.ndarray): (B, o) targets of each position.
+    automorphisms (list): (n,) arrays with the image of each node under
+                          further automorphisms of the network.
+
+    Returns
+    -------
+    first (np.ndarray): index of one position of each class.
+    inverse (np.ndarray): (B,) class of each position.
+
+    """
+    key = np.hstack([np.sort(labels[sources], axis=1), np.sort(labels[targets], axis=1)])
+    rows = np.arange(len(key))
+    for image in automorphisms:
+        other = np.hstack([np.sort(labels[image[sources]], axis=1), np.sort(labels[image[targets]], axis=1)])
+        # Keep the lexicographically smaller key
+        differ = other != key
+        column = differ.argmax(axis=1)
+        smaller = differ.any(axis=1) & (other[rows, column] < key[rows, column])
+        key[smaller] = other[smaller]
+    _, first, inverse = np.unique(key, axis=0, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+class Candidates(Mapping):
+    """
+    Scores of positions of the adjacent possible, kept as arrays in the
+    order of the adjacent possible, so that they can be selected from
+    without building a dictionary. The positions are identified by their
+    number in that order. For compatibility, the candidates can be read as
+    a dictionary of the scores of the (sources, targets) descriptors.
+
+    Parameters
+    ----------
+    groups (list): (sources, targets, index, scores) of each group of
+                   positions, with the index of each position in the
+                   adjacent possible.
+
+    """
+
+    def __init__(self, groups):
+        groups = list(groups)
+        self.groups = [(sources, targets) for sources, targets, index, scores in groups]
+        index = np.concatenate([index for sources, targets, index, scores in groups] + [np.empty(0, dtype=np.intp)])
+        # Put the positions in the order of the adjacent possible
+        order = np.argsort(index, kind="stable")
+        self.index = index[order]
+        self.scores = np.concatenate([np.asarray(scores, dtype=float) for sources, targets, index, scores in groups] + [np.empty(0)])[order]
+        self.group = np.concatenate([np.full(len(sources), g) for g, (sources, targets) in enumerate(self.groups)] + [np.empty(0, dtype=int)])[order]
+        self.row = np.concatenate([np.arange(len(sources)) for sources, targets in self.groups] + [np.empty(0, dtype=int)])[order]
+        return None
+
+    def position(self, i):
+        # Descriptor of the position numbered i
+        sources, targets = self.groups[self.group[i]]
+        row = self.row[i]
+        return next(descriptors(sources[row:row+1], targets[row:row+1]))
+
+    def find(self, pos):
+        # Number of the position with the given descriptor
+        sources, targets = (np.array(nodes, dtype=np.intp) for nodes in pos)
+        for g, (S, T) in enumerate(self.groups):
+            if S.shape[1] == len(sources) and T.shape[1] == len(targets):
+                rows = np.flatnonzero((S == sources).all(axis=1) & (T == targets).all(axis=1))
+                if len(rows) > 0:
+                    return int(np.flatnonzero((self.group == g) & (self.row == rows[0]))[0])
+        raise KeyError(pos)
+
+    def __getitem__(self, pos):
+        return float(self.scores[self.find(pos)])
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __iter__(self):
+        for i in range(len(self.scores)):
+            yield self.position(i)
+
+    def values(self):
+        return self.scores.tolist()
+
+    def items(self):
+        return zip(self, self.scores.tolist())
+
+class SpaceRecorder():
+    """
+    Records the scores of the adjacent possible at each step of grow, as
+    they are explored, with the score and relative rank of the selected
+    position, so the opportunity space can be studied without scoring it
+    again. When memory is tight, only a fixed number of quantiles of the
+    scores are kept at each step.
+
+    Parameters
+    ----------
+    quantiles (int): the number of evenly spaced quantiles to keep of the
+                     scores of each step, or None to keep every score.
+
+    """
+
+    def __init__(self, quantiles=None):
+        self.quantiles = quantiles
+        self.spaces = []
+        self.sizes = []
+        self.selected = []
+        self.ranks = []
+        return None
+
+    def start(self, model):
+        # Protest before growing if the model does not score the adjacent possible
+        if not hasattr(model, "space"):
+            raise ValueError("The model has no adjacent possible to record")
+        if model.specs.get("select") == "random":
+            raise ValueError("Random selection does not score the adjacent possible, so there is nothing to record")
+        if model.specs.get("engine") == "sample":
+            raise ValueError("The sample engine only bounds the scores of the adjacent possible, so there is nothing to record")
+        if model.specs.get("engine") == "bound":
+            raise ValueError("The bound engine only scores the positions that survive pruning, not the whole adjacent possible")
+        return None
+
+    def scores(self, V):
+        # The scores before selection
+        if not isinstance(V, Mapping):
+            raise ValueError("The adjacent possible has no scores to record")
+        return V if isinstance(V, Candidates) else dict(V)
+
+    def record(self, V, pos):
+        # Keep the scores, or their quantiles, and where the selected position ranks among them
+        scores = V.scores.copy() if isinstance(V, Candidates) else np.fromiter(V.values(), dtype=float, count=len(V))
+        score = V[pos]
+        if self.quantiles is not None:
+            self.spaces.append(np.quantile(scores, np.linspace(0, 1, self.quantiles)))
+        else:
+            self.spaces.append(scores)
+        self.sizes.append(len(scores))
+        self.selected.append(score)
+        self.ranks.append(np.count_nonzero(scores < score) / max(len(scores) - 1, 1))
+        return None
+
+    def __len__(self):
+        return len(self.spaces)
+
+    def result(self):
+        # The scores or quantiles of each step, and the number of positions, selected score and its rank
+        spaces = np.array(self.spaces) if self.quantiles is not None else self.spaces
+        return spaces, np.array(self.sizes), np.array(self.selected), np.array(self.ranks)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+import shutil
+import pickle
+import numpy as np
+import networkx as nx
+
+from src.base import Endogenous
+from src.network import Network
+
+VERSION = 1
+
+def arrays(model):
+    """
+    The edges and snapshot scores of a grown model as arrays, with the
+    nodes numbered in the order they joined the network.
+
+    Parameters
+    ----------
+    model (Endogenous or Exogenous): the grown model.
+
+    Returns
+    -------
+    edges (np.ndarray): (E, 2) source and target of each edge, in the
+                        order the edges joined the network.
+    sizes (np.ndarray): (T,) number of nodes in each snapshot.
+    scores (np.ndarray): (T, N) score of each node in each snapshot, NaN
+                         before the node joins.
+
+    """
+    if hasattr(model.networks, "matrix"):
+        edges = np.column_stack([model.G.sources[:model.G.m], model.G.targets[:model.G.m]])
+        return edges, model.networks.sizes(), model.networks.matrix()
+    # Otherwise, read the edges and scores from the stored graphs
+    G = model.networks[-1]
+    index = {node: i for i, node in enumerate(sorted(G.nodes()))}
+    edges = np.array([(index[source], index[target]) for source, target in G.edges()], dtype=np.intp).reshape(-1, 2)
+    edges = edges[np.argsort(edges.max(axis=1), kind="stable")]
+    sizes = np.array([H.number_of_nodes() for H in model.networks])
+    scores = np.full((len(sizes), len(index)), np.nan)
+    for i, H in enumerate(model.networks):
+        for node, score in H.nodes(data='score'):
+            scores[i, index[node]] = score
+    return edges, sizes, scores
+
+def save_run(model, path, space=None):
+    """
+    Save a grown model in the columnar run format: a directory with the
+    specifications in meta.json and one .npy file per array, which can be
+    memory-mapped when loaded.
+
+    Parameters
+    ----------
+    model (Endogenous or Exogenous): the grown model.
+    path (str): the run directory to create.
+    space (list): optionally, the scores of the adjacent possible at each
+                  step, one array per step. Defaults to those kept by the
+                  recorder of the model, if any.
+
+    Returns
+    -------
+    path (str): the run directory.
+
+    """
+    edges, sizes, scores = arrays(model)
+    recorder = getattr(model, "recorder", None)
+    if space is None and recorder is not None and recorder.quantiles is None:
+        space = recorder.spaces
+    meta = {"version":VERSION,
+            "name":model.name,
+            "model":type(model).__name__,
+            "specs":model.specs}
+    # Write to a temporary directory first so an interrupted save leaves no run
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    np.save(os.path.join(tmp, "edges.npy"), edges.astype(np.int64))
+    np.save(os.path.join(tmp, "sizes.npy"), sizes.astype(np.int64))
+    # Store the scores node-major, so that the trajectory of a node is contiguous on disk
+    np.save(os.path.join(tmp, "scores.npy"), np.asfortranarray(scores))
+    if space is not None:
+        offsets = np.cumsum([0] + [len(V) for V in space])
+        np.save(os.path.join(tmp, "space.npy"), np.concatenate([np.asarray(V, dtype=float) for V in space] + [np.empty(0)]))
+        np.save(os.path.join(tmp, "space_offsets.npy"), offsets.astype(np.int64))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return path
+
+def convert(file, path):
+    """
+    Convert a pickled model, as saved by the notebooks, to the columnar
+    run format.
+
+    Parameters
+    ----------
+    file (str): the pickle file.
+    path (str): the run directory to create.
+
+    Returns
+    -------
+    path (str): the run directory.
+
+    """
+    with open(file, "rb") as f:
+        model = pickle.load(f)
+    return save_run(model, path)
+
+def upgrade(model, alpha=0.95, gamma=None):
+    """
+    Rebuild an endogenous model pickled before the network was array-backed,
+    when the positions of the adjacent possible were extra nodes of model.G,
+    so that it can explore and grow again. Those pickles do not keep the
+    parameters of the run, which lived on the class, so the damping factor
+    and gamma are given; the selection is read from the pickled selector and
+    m from the initial snapshot.
+
+    Parameters
+    ----------
+    model (Endogenous): the unpickled model.
+    alpha (float): the damping factor of the run.
+    gamma (float): the exponential factor of the run, if opportunistic.
+
+    Returns
+    -------
+    model (Endogenous): the rebuilt model, or the model itself if it was
+                        pickled by this version.
+
+    """
+    if not isinstance(model, Endogenous) or isinstance(model.G, Network):
+        return model
+    select = model.__dict__["select"].__name__.replace("select_", "")
+    m = model.networks[0].number_of_nodes()
+    new = type(model)(m=m, select=select, alpha=alpha, gamma=gamma)
+    new.update()
+    # Number the nodes in the order they joined, skipping the positions between them
+    nodes = sorted(model.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    H = model.G.subgraph(nodes)
+    for node in nodes[m:]:
+        new.G.join(sorted(index[v] for v in H.predecessors(node) if index[v] < index[node]),
+                   sorted(index[v] for v in H.successors(node) if index[v] < index[node]))
+    new.nodes = set(new.G.nodes())
+    new.networks.scores = []
+    for G in model.networks:
+        new.networks.append([score for node, score in sorted(G.nodes(data='score'))])
+    # The adjacent possible holds the positions of every node but the last, as after grow
+    for node in range(m, len(nodes) - 1):
+        new.update(node=node)
+    return new
+
+class Run():
+    """
+    A run saved in the columnar run format. The arrays are memory-mapped,
+    and the score matrix is stored node-major, so reading one node's score
+    trajectory only reads the contiguous pages of that column.
+
+    Parameters
+    ----------
+    path (str): the run directory.
+    mmap (bool): whether to memory-map the arrays rather than read them.
+
+    """
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        # Protest if the run was saved by a newer version of the format
+        if meta["version"] > VERSION:
+            raise ValueError("Run format version %d is newer than %d" % (meta["version"], VERSION))
+        self.path = path
+        self.version = meta["version"]
+        self.name = meta["name"]
+        self.model = meta["model"]
+        self.specs = meta["specs"]
+        mode = "r" if mmap else None
+        self.edges = np.load(os.path.join(path, "edges.npy"), mmap_mode=mode)
+        self.sizes = np.load(os.path.join(path, "sizes.npy"), mmap_mode=mode)
+        self.scores = np.load(os.path.join(path, "scores.npy"), mmap_mode=mode)
+        if os.path.exists(os.path.join(path, "space.npy")):
+            self.space_values = np.load(os.path.join(path, "space.npy"), mmap_mode=mode)
+            self.space_offsets = np.load(os.path.join(path, "space_offsets.npy"))
+        else:
+            self.space_values = self.space_offsets = None
+        return None
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def trajectory(self, node):
+        # Scores of the node in every snapshot, NaN before it joins, from its contiguous column
+        return np.asarray(self.scores[:, node])
+
+    def space(self, step):
+        # Scores of the adjacent possible at the step
+        if self.space_offsets is None:
+            return None
+        return np.asarray(self.space_values[self.space_offsets[step]:self.space_offsets[step+1]])
+
+    def network(self):
+        # The final network
+        return Network(np.asarray(self.edges).tolist())
+
+    def snapshot(self, i):
+        # The snapshot as a networkx graph with the 'score' node attribute
+        n = int(self.sizes[i])
+        G = self.network().to_networkx(n)
+        nx.set_node_attributes(G, dict(enumerate(np.asarray(self.scores[i, :n]).tolist())), 'score')
+        return G
+
+def load_run(path, mmap=True):
+    """
+    Load a run saved in the columnar run format.
+
+    Parameters
+    ----------
+    path (str): the run directory.
+    mmap (bool): whether to memory-map the arrays rather than read them.
+
+    Returns
+    -------
+    run (Run): the run.
+
+    """
+    return Run(path, mmap=mmap)
@@ -2,7 +2,9 @@
 # coding: utf-8
 
 
+import os
 import sys
+import math
 import random
 import numpy as np
 from scipy import stats
@@ -37,6 +39,170 @@ def softmax(A, g=1.0):
     
     return A
 
+def choose(weights, u):
+    """
+    Index drawn with probability proportional to the weights, by inverting
+    their cumulative sum at a uniform draw as random.choices does, so the
+    same draw selects the same index.
+
+    Parameters
+    ----------
+    weights (np.ndarray): the non-negative weights.
+    u (float): a uniform draw in [0, 1).
+
+    Returns
+    -------
+    index (int): the selected index.
+
+    """
+    cumulative = np.cumsum(weights)
+    index = np.searchsorted(cumulative, u * cumulative[-1], side="right")
+    return int(min(index, len(cumulative) - 1))
+
+def combinations(n, k):
+    """
+    All combinations of k nodes among the nodes 0 to n-1, in the order of
+    itertools.combinations(range(n), k).
+
+    Parameters
+    ----------
+    n (int): the number of nodes to choose from.
+    k (int): the number of nodes in each combination.
+
+    Returns
+    -------
+    C (np.ndarray): (comb(n, k), k) array with one combination per row.
+
+    """
+    # Extend the combinations one column at a time, each row by every larger node that leaves room for the rest
+    C = np.zeros((1, 0), dtype=np.intp)
+    for j in range(k):
+        start = C[:, -1] + 1 if j > 0 else np.zeros(1, dtype=np.intp)
+        counts = np.maximum(n - k + j + 1 - start, 0)
+        rows = np.repeat(np.arange(len(C)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        C = np.column_stack([C[rows], start[rows] + within]).astype(np.intp)
+    return C.reshape(math.comb(n, k), k)
+
+class FenwickTree():
+    """
+    Growable Fenwick tree over non-negative weights, for sampling an index
+    with probability proportional to its weight. Updating a weight,
+    appending one and sampling each take O(log n). The weights themselves
+    are kept exactly, while the partial sums of the tree take the rounding
+    of every update, so the tree is rebuilt from the weights after as many
+    updates as there are weights, which costs O(1) per update amortized.
+
+    Parameters
+    ----------
+    weights (iterable): the initial weights.
+
+    """
+
+    def __init__(self, weights=()):
+        self.rebuild(weights)
+        return None
+
+    def rebuild(self, weights):
+        # Build the tree from scratch in O(n)
+        self.weights = [float(w) for w in weights]
+        self.tree = [0.0] + self.weights
+        self.updates = 0
+        for i in range(1, len(self.tree)):
+            j = i + (i & -i)
+            if j < len(self.tree):
+                self.tree[j] += self.tree[i]
+        return None
+
+    def __len__(self):
+        return len(self.weights)
+
+    def prefix(self, i):
+        # Sum of the first i weights
+        total = 0.0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def total(self):
+        return self.prefix(len(self.weights))
+
+    def add(self, index, delta):
+        # Add delta to the weight of the index
+        self.set(index, self.weights[index] + delta)
+        return None
+
+    def set(self, index, weight):
+        # Add the change to the partial sums, or rebuild them once the rounding has built up
+        delta = float(weight) - self.weights[index]
+        self.weights[index] = float(weight)
+        self.updates += 1
+        if self.updates >= len(self.weights):
+            self.rebuild(self.weights)
+            return None
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+        return None
+
+    def append(self, weight):
+        # The new node covers the weights since the one its lowest bit skips
+        i = len(self.tree)
+        self.weights.append(float(weight))
+        self.tree.append(float(weight) + self.prefix(i - 1) - self.prefix(i - (i & -i)))
+        return None
+
+    def find(self, u):
+        """
+        The first index whose cumulative weight exceeds u, as bisect does on
+        the cumulative weights in random.choices.
+
+        Parameters
+        ----------
+        u (float): a value between 0 and the total weight.
+
+        Returns
+        -------
+        index (int): the sampled index.
+
+        """
+        i, step = 0, 1 << len(self.tree).bit_length()
+        while step:
+            if i + step < len(self.tree) and self.tree[i + step] <= u:
+                i += step
+                u -= self.tree[i]
+            step >>= 1
+        # Guard against rounding past the last weight, back to the last positive one
+        if i >= len(self.weights):
+            i = len(self.weights) - 1
+            while i > 0 and self.weights[i] <= 0:
+                i -= 1
+        return i
+
+def memory():
+    """
+    Resident set size of the process, read from /proc where available and
+    otherwise the peak resident set size.
+
+    Returns
+    -------
+    rss (int): the resident set size in bytes, or None if unknown.
+
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
 def directed_cycle_graph(num_nodes):
     """
     Directed cycle graph with m nodes.
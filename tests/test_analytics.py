@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import pickle
+import numpy as np
+import pytest
+
+from src.models import InOneOutOne
+from src.storage import save_run
+from src.analytics import ranks, load, entrants, trajectories, ensemble
+
+def notebook_ranks(G):
+    # Relative ranks as plots_ranks.ipynb computes them, sorting the nodes by score with ties by node ID
+    values = dict(sorted(G.nodes(data="score")))
+    ranking = {node: rank for rank, node in enumerate(sorted(values, key=values.get))}
+    return {node: rank / max(len(values) - 1, 1) for node, rank in ranking.items()}
+
+@pytest.fixture
+def run(tmp_path):
+    model = InOneOutOne(m=4, select="opportunistic", gamma=1, engine="lowrank", seed=6)
+    model.grow(20)
+    with open(tmp_path / "run_0.pkl", "wb") as f:
+        pickle.dump(model, f)
+    save_run(model, str(tmp_path / "run_1"))
+    return model
+
+def test_ranks_match_the_notebook(run):
+    R = ranks(run.networks.matrix())
+    for i, G in enumerate(run.networks):
+        expected = notebook_ranks(G)
+        np.testing.assert_allclose(R[i, :len(expected)], [expected[node] for node in range(len(expected))])
+        assert np.all(np.isnan(R[i, len(expected):]))
+
+def test_ranks_break_ties_by_node():
+    scores = np.array([[0.5, 0.5, np.nan], [0.2, 0.2, 0.2]])
+    np.testing.assert_allclose(ranks(scores)[0, :2], [0.0, 1.0])
+    np.testing.assert_allclose(ranks(scores)[1], [0.0, 0.5, 1.0])
+
+def test_pickled_and_columnar_runs_agree(run, tmp_path):
+    pickled = load(str(tmp_path / "run_0.pkl"))
+    columnar = load(str(tmp_path / "run_1"), cache_dir=str(tmp_path / "cache"))
+    cached = load(str(tmp_path / "run_1"), cache_dir=str(tmp_path / "cache"))
+    for key in ["edges", "sizes", "scores", "ranks"]:
+        np.testing.assert_array_equal(pickled[key], columnar[key])
+        np.testing.assert_array_equal(cached[key], columnar[key])
+    # Each node enters at the rank the notebook gives it in its first snapshot
+    nodes, rank = entrants(pickled)
+    for node, r in zip(nodes, rank):
+        assert r == pytest.approx(notebook_ranks(run.networks[node])[node])
+    ranked, scored = trajectories(pickled, [10])[10]
+    np.testing.assert_array_equal(scored, pickled["scores"][9:, 9])
+
+def test_ensemble_frames(run, tmp_path):
+    pytest.importorskip("pandas")
+    frames = ensemble([str(tmp_path / "run_0.pkl"), str(tmp_path / "run_1")], steps=[5, 10])
+    assert sorted(frames["entrants"]["run"].unique()) == [0, 1]
+    assert len(frames["alters"]) == 2 * (run.G.number_of_edges() - 4)
+    assert set(frames["trajectories"]["i"]) == {5, 10}
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+import pytest
+
+from src.base import Exogenous, resume
+from src.models import InOneOutOne, InOneOutTwo
+
+MODELS = [lambda: InOneOutOne(m=4, select="opportunistic", gamma=1, engine="lowrank", seed=3),
+          lambda: InOneOutTwo(m=4, select="random", seed=3),
+          lambda: Exogenous(m=3, select="preferential", gamma=2, seed=3)]
+
+class Interrupt(Exception):
+    pass
+
+def interrupt(at):
+    # A hook that stops the run when the network reaches the given size
+    def hook(event):
+        if event["n"] == at:
+            raise Interrupt()
+    return hook
+
+@pytest.mark.parametrize("model", MODELS)
+def test_resume_follows_the_same_trajectory(model, tmp_path):
+    file = str(tmp_path / "run.ckpt")
+    whole = model()
+    whole.grow(30)
+    run = model()
+    run.add_hook(interrupt(23))
+    with pytest.raises(Interrupt):
+        run.grow(30, checkpoint=file, every=5)
+    # The run picks up from the last checkpoint, a few steps before the interruption
+    resumed = resume(file)
+    assert list(resumed.G.edges()) == list(whole.G.edges())
+    assert len(resumed.networks) == len(whole.networks)
+    for x, y in zip(resumed.networks.scores, whole.networks.scores):
+        np.testing.assert_array_equal(x, y)
+
+def test_resume_grows_further(tmp_path):
+    file = str(tmp_path / "run.ckpt")
+    whole = MODELS[0]()
+    whole.grow(25)
+    run = MODELS[0]()
+    run.grow(20, checkpoint=file, every=4)
+    resumed = resume(file, N=25)
+    assert list(resumed.G.edges()) == list(whole.G.edges())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+import pytest
+
+from src.models import InOneOutOne, InOneOutTwo
+from src.pagerank import pagerank_networkx, pagerank_lowrank, pagerank_batched, pagerank_bounds, warm_start
+
+def grown(model, N=20, seed=0):
+    # A network grown to N nodes, with the adjacent possible of its next node
+    run = model(m=4, select="opportunistic", gamma=1, engine="lowrank", seed=seed)
+    run.grow(N)
+    run.update(node=N - 1)
+    return run
+
+@pytest.mark.parametrize("model", [InOneOutOne, InOneOutTwo])
+def test_lowrank_matches_networkx(model):
+    run = grown(model)
+    W, H = run.G.transition(), run.G.to_networkx()
+    for sources, targets in run.space.groups(50):
+        exact = pagerank_networkx(H, sources, targets, 0.95)
+        np.testing.assert_allclose(pagerank_lowrank(W, sources, targets, 0.95), exact, rtol=1e-4)
+
+def test_lowrank_full_matches_networkx():
+    run = grown(InOneOutOne)
+    W, H = run.G.transition(), run.G.to_networkx()
+    sources, targets = next(run.space.groups(5))
+    X = pagerank_lowrank(W, sources, targets, 0.95, full=True)
+    # The scores of every node sum to one, and the new node's matches networkx
+    np.testing.assert_allclose(X.sum(axis=1), 1.0)
+    np.testing.assert_allclose(X[:, -1], pagerank_networkx(H, sources, targets, 0.95), rtol=1e-4)
+
+@pytest.mark.parametrize("model", [InOneOutOne, InOneOutTwo])
+def test_batched_matches_networkx(model):
+    run = grown(model)
+    W, H = run.G.transition(), run.G.to_networkx()
+    for sources, targets in run.space.groups(50):
+        exact = pagerank_networkx(H, sources, targets, 0.95)
+        np.testing.assert_allclose(pagerank_batched(W, sources, targets, 0.95), exact, rtol=1e-4)
+
+def test_batched_chunks_give_the_same_scores():
+    run = grown(InOneOutTwo)
+    W = run.G.transition()
+    sources, targets = next(run.space.groups(40))
+    np.testing.assert_allclose(pagerank_batched(W, sources, targets, 0.95, chunk_size=7),
+                               pagerank_batched(W, sources, targets, 0.95), rtol=1e-12)
+
+@pytest.mark.parametrize("model", [InOneOutOne, InOneOutTwo])
+def test_bounds_enclose_the_exact_scores(model):
+    run = grown(model)
+    W = run.G.transition()
+    for sources, targets in run.space.groups(50):
+        exact = pagerank_lowrank(W, sources, targets, 0.95)
+        X = warm_start(W, sources, 0.95, run.networks.scores[-1])
+        # The bounds hold after any number of iterations, resumed from where they stopped
+        for iterations in [1, 1, 5, 20]:
+            X, lower, upper = pagerank_bounds(W, sources, targets, 0.95, X, iterations)
+            assert np.all(lower <= exact + 1e-12) and np.all(exact <= upper + 1e-12)
+
+@pytest.mark.parametrize("model", [InOneOutOne, InOneOutTwo])
+def test_bound_selects_as_lowrank(model):
+    runs = [model(m=4, select="optimal", engine=engine, rounds=2, chunk_size=20, seed=3) for engine in ["bound", "lowrank"]]
+    for run in runs:
+        run.grow(16)
+    bound, lowrank = runs
+    assert list(bound.G.edges()) == list(lowrank.G.edges())
+    # Pruning keeps every position tied for the best score at each step
+    for n in range(4, 16):
+        V, U = bound.rewind(n).explore(), lowrank.rewind(n).explore()
+        ties = lambda V: {V.position(i) for i in np.flatnonzero(np.isclose(V.scores, V.scores.max(), rtol=1e-9, atol=0))}
+        assert ties(V) == ties(U)
+    assert sum(step["pruned"] for step in bound.pruned) > 0
+
+def sampled(gamma, N=6, seed=4):
+    # The sample engine's bounds on the adjacent possible of a small network, with the exact scores
+    run = InOneOutOne(m=3, select="opportunistic", gamma=gamma, engine="sample", seed=seed)
+    run.grow(N)
+    run.update(node=N - 1)
+    V = run.explore()
+    exact = np.concatenate([pagerank_lowrank(run.cache["W"], sources, targets, 0.95) for sources, targets in run.space.groups()])
+    return run, V, exact
+
+@pytest.mark.parametrize("gamma", [0.5, 1, 4])
+def test_sample_bounds_the_exact_scores(gamma):
+    run, V, exact = sampled(gamma)
+    assert list(V) == list(run.space)
+    assert np.all(V.scores >= exact - 1e-12)
+
+def test_sample_draws_from_the_opportunistic_distribution():
+    from scipy.stats import chisquare
+    run, V, exact = sampled(2, N=5)
+    draws = 600
+    counts = np.zeros(len(V))
+    for _ in range(draws):
+        counts[V.find(run.select(V))] += 1
+    # The draws follow the exact scores to the power gamma, by a chi-square test on enough draws of every position
+    expected = exact ** 2 / np.sum(exact ** 2) * draws
+    assert expected.min() >= 5
+    assert chisquare(counts, expected).pvalue > 0.01
+
+@pytest.mark.parametrize("model", [InOneOutOne, InOneOutTwo])
+@pytest.mark.parametrize("gamma", [1, 4])
+def test_warm_matches_networkx(model, gamma):
+    run = model(m=4, select="opportunistic", gamma=gamma, engine="warm", seed=0)
+    run.grow(20)
+    run.update(node=19)
+    V = run.explore()
+    H = run.G.to_networkx()
+    exact = np.concatenate([pagerank_networkx(H, sources, targets, 0.95) for sources, targets in run.space.groups()])
+    np.testing.assert_allclose(V.scores, exact, rtol=1e-4)
+
+def test_warm_finds_the_best_score_of_networkx():
+    run = InOneOutOne(m=4, select="optimal", engine="warm", seed=0)
+    run.grow(20)
+    run.update(node=19)
+    V = run.explore()
+    H = run.G.to_networkx()
+    exact = np.concatenate([pagerank_networkx(H, sources, targets, 0.95) for sources, targets in run.space.groups()])
+    # Positions that cannot be best stop early, but the best is solved to the tolerance
+    assert V.scores.max() == pytest.approx(exact.max(), rel=1e-4)
+    assert np.all(V.scores <= exact.max() * (1 + 1e-4))
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import gc
+import numpy as np
+import pytest
+
+from src.models import InOneOutOne, InOneOutTwo
+
+@pytest.mark.parametrize("model,engine", [(InOneOutOne, "lowrank"), (InOneOutTwo, "batched")])
+def test_workers_give_the_serial_scores(model, engine):
+    runs = []
+    for workers in [None, 2]:
+        with model(m=4, select="opportunistic", gamma=2, engine=engine, chunk_size=30, workers=workers, seed=5) as run:
+            run.grow(14)
+        runs.append(run)
+    serial, pooled = runs
+    assert pooled.executor is None
+    assert list(serial.G.edges()) == list(pooled.G.edges())
+    np.testing.assert_array_equal(serial.networks.matrix(), pooled.networks.matrix())
+    # The scores of every position are the same bit for bit
+    np.testing.assert_array_equal(serial.rewind(10).explore().scores, pooled.rewind(10).explore().scores)
+
+def test_dropped_models_shut_their_workers_down():
+    run = InOneOutOne(m=4, select="optimal", engine="lowrank", workers=2, seed=0)
+    run.grow(8)
+    finalizer, executor = run.finalizer, run.executor
+    assert finalizer.alive
+    del run
+    gc.collect()
+    assert not finalizer.alive
+    with pytest.raises(RuntimeError):
+        executor.submit(len, ())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+import pytest
+
+from src.models import InOneOutOne, InOneOutTwo
+from src.motifs import MOTIFS
+from src.space import Candidates, SpaceRecorder, descriptors
+
+def test_candidates_round_trip():
+    run = InOneOutTwo(m=4, select="optimal", engine="lowrank", seed=1)
+    run.grow(12)
+    run.update(node=11)
+    groups = list(run.space.groups(7, index=True))
+    rng = np.random.default_rng(0)
+    scores = [rng.random(len(sources)) for sources, targets, index in groups]
+    # Hand the groups over out of order
+    V = Candidates([group + (x,) for group, x in reversed(list(zip(groups, scores)))])
+    expected = {}
+    for (sources, targets, index), x in zip(groups, scores):
+        expected.update(zip(descriptors(sources, targets), x.tolist()))
+    # The positions come in the order of the adjacent possible, and read as a dictionary
+    assert list(V) == list(run.space)
+    assert dict(V.items()) == expected
+    for i in range(len(V)):
+        pos = V.position(i)
+        assert V.find(pos) == i
+        assert V[pos] == V.scores[i]
+    with pytest.raises(KeyError):
+        V.find(((0,), (0, 0)))
+
+def test_recorder_keeps_the_explored_scores(tmp_path):
+    from src.storage import save_run, load_run
+    run = InOneOutOne(m=4, select="opportunistic", gamma=1, engine="lowrank", seed=2)
+    recorder = SpaceRecorder()
+    events = []
+    run.add_hook(events.append)
+    run.grow(15, recorder=recorder)
+    spaces, sizes, selected, ranks = recorder.result()
+    assert len(spaces) == 11
+    # The hooks are told the size of the adjacent possible that was recorded
+    assert [event["candidates"] for event in events] == sizes.tolist()
+    # Each step's scores are those of exploring the network as it was then
+    for step, n in enumerate(range(4, 15)):
+        before = run.rewind(n)
+        np.testing.assert_allclose(before.explore().scores, spaces[step])
+        assert sizes[step] == len(spaces[step])
+        assert selected[step] in spaces[step]
+        assert 0 <= ranks[step] <= 1
+    # The runs saved with the recorder keep its scores
+    saved = load_run(save_run(run, str(tmp_path / "run")))
+    for step in range(len(spaces)):
+        np.testing.assert_array_equal(saved.space(step), spaces[step])
+
+def test_recorder_quantiles():
+    recorder = SpaceRecorder(quantiles=5)
+    run = InOneOutOne(m=4, select="optimal", engine="lowrank", seed=2)
+    run.grow(12, recorder=recorder)
+    spaces, sizes, selected, ranks = recorder.result()
+    assert spaces.shape == (8, 5)
+    # The best position is selected, at the top of the quantiles
+    np.testing.assert_allclose(selected, spaces[:, -1])
+    assert np.all(sizes > 5)
+
+def opportunistic(scores, gamma):
+    # A model ready to select from the given scores of its initial positions
+    run = InOneOutOne(m=3, select="opportunistic", gamma=gamma, engine="lowrank", seed=0)
+    run.update()
+    groups = list(run.space.groups(index=True))
+    return run, Candidates([group + (np.array(scores, dtype=float),) for group in groups])
+
+@pytest.mark.parametrize("gamma", [1, 2, -1])
+def test_opportunistic_never_selects_negative_estimates(gamma):
+    run, V = opportunistic([-1e-9, 0.0, 0.3, -0.2, 0.0, 0.0], gamma)
+    assert {run.select(V) for _ in range(50)} == {V.position(2)}
+
+@pytest.mark.parametrize("scores", [[0.0] * 6, [-1e-9, 0.0, -1e-12, 0.0, -0.1, 0.0]])
+def test_opportunistic_refuses_no_positive_scores(scores):
+    run, V = opportunistic(scores, 2)
+    with pytest.raises(ValueError):
+        run.select(V)
+
+@pytest.mark.parametrize("kwargs", [{"select":"random"},
+                                    {"select":"opportunistic", "gamma":1, "engine":"sample"},
+                                    {"select":"optimal", "engine":"bound"}])
+def test_recorder_refuses_unscored_spaces(kwargs):
+    run = InOneOutOne(m=4, seed=0, **kwargs)
+    with pytest.raises(ValueError):
+        run.grow(10, recorder=SpaceRecorder())
+    assert len(run.nodes) == 4
+
+# The positions among the initial nodes, and those of node 3 with its first alter combinations,
+# with the alters numbered from the oldest
+ENUMERATIONS = {
+    "i1o1":(3, [((0,), (1,)), ((0,), (2,)), ((1,), (0,)), ((1,), (2,)), ((2,), (0,)), ((2,), (1,))],
+            [[0], [1]], [((3,), (0,)), ((3,), (1,)), ((0,), (3,)), ((1,), (3,))]),
+    "i1o2":(3, [((0,), (1, 2)), ((1,), (0, 2)), ((2,), (0, 1))],
+            [[0, 1], [0, 2]], [((3,), (0, 1)), ((3,), (0, 2)), ((0,), (3, 1)), ((0,), (3, 2))]),
+    "i2o1":(3, [((1, 2), (0,)), ((0, 2), (1,)), ((0, 1), (2,))],
+            [[0, 1], [0, 2]], [((3, 0), (1,)), ((3, 0), (2,)), ((0, 1), (3,)), ((0, 2), (3,))]),
+    "io3":(3, [((1, 2), (0,)), ((0,), (1, 2)), ((0, 2), (1,)), ((1,), (0, 2)), ((0, 1), (2,)), ((2,), (0, 1))],
+           [[0, 1], [0, 2]], [((3, 0), (1,)), ((3, 0), (2,)), ((3,), (0, 1)), ((3,), (0, 2)),
+                              ((0, 1), (3,)), ((0, 2), (3,)), ((0,), (3, 1)), ((0,), (3, 2))]),
+    "i2o2":(4, [((0, 1), (2, 3)), ((0, 2), (1, 3)), ((0, 3), (1, 2)), ((1, 2), (0, 3)), ((1, 3), (0, 2)), ((2, 3), (0, 1))],
+            [[0, 1, 2]], [((3, 0), (1, 2)), ((3, 1), (0, 2)), ((3, 2), (0, 1)), ((1, 2), (0, 3)), ((0, 2), (1, 3)), ((0, 1), (2, 3))]),
+}
+
+@pytest.mark.parametrize("name", sorted(MOTIFS))
+def test_motif_enumeration(name):
+    motif = MOTIFS[name]
+    m, initial, alters, positions = ENUMERATIONS[name]
+    assert [(tuple(S), tuple(T)) for S, T in zip(*motif.initial(range(m)))] == initial
+    assert [pos for S, T in motif.positions(3, np.array(alters, dtype=np.intp)) for pos in descriptors(S, T)] == positions
+    # The adjacent possible of the model keeps the initial positions grouped by shape
+    run = InOneOutOne(m=m, motif=motif)
+    run.update()
+    shapes = [(len(S), len(T)) for S, T in initial]
+    assert list(run.space) == sorted(initial, key=lambda pos: shapes.index((len(pos[0]), len(pos[1]))))
+
+@pytest.mark.parametrize("model,engine,select,orbits", [(InOneOutTwo, "lowrank", "optimal", 0),
+                                                        (InOneOutTwo, "batched", "opportunistic", 5),
+                                                        (InOneOutOne, "warm", "opportunistic", 5),
+                                                        (InOneOutOne, "networkx", "optimal", 5)])
+def test_dedup_keeps_the_scores_and_trajectory(model, engine, select, orbits):
+    gamma = 2 if select == "opportunistic" else None
+    plain, dedup = [model(m=4, select=select, gamma=gamma, engine=engine, dedup=flag, orbits=orbits, seed=3) for flag in [False, True]]
+    plain.grow(14)
+    dedup.grow(14)
+    assert list(plain.G.edges()) == list(dedup.G.edges())
+    np.testing.assert_array_equal(plain.networks.matrix(), dedup.networks.matrix())
+    np.testing.assert_array_equal(plain.rewind(12).explore().scores, dedup.rewind(12).explore().scores)
+    # Some positions shared the score of their class
+    assert sum(step["scored"] for step in dedup.shared) < sum(step["candidates"] for step in dedup.shared)
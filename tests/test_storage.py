@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import json
+import pickle
+import numpy as np
+import networkx as nx
+import pytest
+
+from src.base import Exogenous
+from src.models import InOneOutOne, InOneOutTwo
+from src.storage import save_run, load_run, convert
+
+MODELS = [lambda: InOneOutOne(m=4, select="opportunistic", gamma=2, engine="lowrank", seed=4),
+          lambda: InOneOutTwo(m=3, select="random", seed=4),
+          lambda: Exogenous(m=3, select="preferential", gamma=1, seed=4)]
+
+@pytest.mark.parametrize("model", MODELS)
+def test_run_round_trip(model, tmp_path):
+    run = model()
+    run.grow(20)
+    saved = load_run(save_run(run, str(tmp_path / "run")))
+    assert saved.model == type(run).__name__
+    assert saved.specs == run.specs
+    assert len(saved) == len(run.networks)
+    # Every snapshot comes back with the same edges and scores
+    for i in [0, 5, len(run.networks) - 1]:
+        G, H = saved.snapshot(i), run.networks[i]
+        assert sorted(G.edges()) == sorted(H.edges())
+        assert nx.get_node_attributes(G, "score") == pytest.approx(nx.get_node_attributes(H, "score"))
+    # A node's trajectory is its column, contiguous on disk, NaN before it joins
+    assert saved.scores.flags.f_contiguous
+    assert saved.scores[:, 10].flags.contiguous
+    x = saved.trajectory(10)
+    assert np.all(np.isnan(x[saved.sizes <= 10]))
+    assert not np.any(np.isnan(x[saved.sizes > 10]))
+    np.testing.assert_array_equal(x[-1], run.networks.scores[-1][10])
+
+def test_convert_matches_save_run(tmp_path):
+    run = MODELS[0]()
+    run.grow(15)
+    with open(tmp_path / "run.pkl", "wb") as f:
+        pickle.dump(run, f)
+    converted = load_run(convert(str(tmp_path / "run.pkl"), str(tmp_path / "converted")))
+    saved = load_run(save_run(run, str(tmp_path / "saved")))
+    for key in ["edges", "sizes", "scores"]:
+        np.testing.assert_array_equal(getattr(converted, key), getattr(saved, key))
+
+def test_run_refuses_newer_versions(tmp_path):
+    run = MODELS[1]()
+    run.grow(8)
+    path = save_run(run, str(tmp_path / "run"))
+    with open(tmp_path / "run" / "meta.json") as f:
+        meta = json.load(f)
+    meta["version"] += 1
+    with open(tmp_path / "run" / "meta.json", "w") as f:
+        json.dump(meta, f)
+    with pytest.raises(ValueError):
+        load_run(path)
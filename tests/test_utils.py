@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import bisect
+import random
+import itertools
+import numpy as np
+import pytest
+
+from src.utils import FenwickTree
+
+def test_prefix_sums():
+    rng = random.Random(0)
+    weights = [rng.random() for _ in range(37)]
+    tree = FenwickTree(weights)
+    for i in range(len(weights) + 1):
+        assert tree.prefix(i) == pytest.approx(sum(weights[:i]))
+    assert tree.total() == pytest.approx(sum(weights))
+
+def test_set_and_append_keep_the_sums():
+    rng = random.Random(1)
+    weights = [rng.random() for _ in range(5)]
+    tree = FenwickTree(weights)
+    for _ in range(200):
+        if rng.random() < 0.3:
+            weights.append(rng.random())
+            tree.append(weights[-1])
+        else:
+            index = rng.randrange(len(weights))
+            weights[index] = rng.random()
+            tree.set(index, weights[index])
+        assert tree.weights == weights
+        for i in range(len(weights) + 1):
+            assert tree.prefix(i) == pytest.approx(sum(weights[:i]))
+
+def test_updates_rebuild_the_sums_exactly():
+    # Adding and taking away a large weight leaves rounding in the partial sums
+    tree = FenwickTree([0.1] * 8)
+    tree.add(0, 1e17)
+    tree.set(0, 0.1)
+    assert tree.weights == [0.1] * 8
+    assert tree.total() != FenwickTree([0.1] * 8).total()
+    # Until as many updates as there are weights rebuild the partial sums from the weights
+    while tree.updates:
+        tree.set(3, 0.1)
+    assert tree.tree == FenwickTree([0.1] * 8).tree
+
+def test_find_matches_bisect():
+    rng = random.Random(2)
+    weights = [rng.choice([0.0, 1.0, 2.0, 3.5]) for _ in range(50)]
+    tree = FenwickTree(weights)
+    cumulative = list(itertools.accumulate(weights))
+    for _ in range(1000):
+        u = rng.random() * cumulative[-1]
+        assert tree.find(u) == bisect.bisect(cumulative, u)
+    # Rounding past the total falls back to the last positive weight
+    last = max(i for i, w in enumerate(weights) if w > 0)
+    assert tree.find(cumulative[-1] * (1 + 1e-12)) == last
+
+def test_sampling_frequencies():
+    rng = random.Random(3)
+    weights = [0.0, 1.0, 2.0, 3.0, 0.0, 4.0]
+    tree = FenwickTree(weights)
+    draws = 40000
+    counts = np.bincount([tree.find(rng.random() * tree.total()) for _ in range(draws)], minlength=len(weights))
+    expected = np.array(weights) / sum(weights) * draws
+    assert counts[0] == counts[4] == 0
+    # Within five standard deviations of the expected counts
+    assert np.all(np.abs(counts - expected) <= 5 * np.sqrt(expected) + 1e-9)